@@ -0,0 +1,89 @@
+import argparse
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULES = [
+    "pango.puzzle",
+    "pango.puzzle_image_solver",
+    "pango.dataset.dataset_packer",
+    "pango.video_solver",
+]
+HEAVY_PACKAGES = ["cv2", "numpy", "imutils", "scipy", "pandas"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Measure module import times with python -X importtime."
+    )
+
+    parser.add_argument(
+        "--modules",
+        type=str,
+        nargs="+",
+        default=DEFAULT_MODULES,
+        help="Modules to import, each in a fresh interpreter.",
+    )
+
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of interpreters started per module.",
+    )
+
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=5,
+        help="Number of slowest top-level packages listed per module.",
+    )
+
+    return parser.parse_args()
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Cumulative import time in microseconds of every module loaded."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def main():
+    args = parse_args()
+
+    for module in args.modules:
+        runs = [import_times(module) for _ in range(args.repeat)]
+        total = statistics.median(run[module] for run in runs)
+        loaded = [package for package in HEAVY_PACKAGES if package in runs[0]]
+
+        print(f"{module}: {total / 1000:.1f} ms")
+        print(f"  heavy packages: {', '.join(loaded) or 'none'}")
+
+        packages = {
+            name: statistics.median(run.get(name, 0) for run in runs)
+            for name in runs[0]
+            if "." not in name and name != module.split(".")[0]
+        }
+
+        for name, time in sorted(packages.items(), key=lambda item: -item[1])[
+            : args.top
+        ]:
+            print(f"  {name:24} {time / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+from dataclasses import dataclass, field
+from typing import Optional
+import argparse
+import glob
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from pango.dataset.dataset_packer import ALLOWED_EXTENSIONS
+from pango.image_processing.puzzle_image_finder import Error as FinderError
+from pango.puzzle import (
+    Cell,
+    CellValue,
+    ConnectionType,
+    Error as PuzzleError,
+    Puzzle,
+    SymbolType,
+)
+from pango.puzzle_image_solver import (
+    Error as SolverError,
+    PuzzleImageSolverPipeline,
+    create_connection,
+    map_connection_to_connection_type,
+    map_shape_to_symbol,
+)
+
+STAGES = ["decode", "find", "recognize", "repair", "solve"]
+PERCENTILES = [50, 90, 99]
+DEFAULT_TOLERANCE = 0.1
+
+# Metrics where a larger value is an improvement; all others should shrink.
+HIGHER_IS_BETTER = ("throughput", "accuracy")
+
+
+@dataclass
+class GroundTruth:
+    cells: list[CellValue]
+    vertical_connections: list[Optional[ConnectionType]]
+    horizontal_connections: list[Optional[ConnectionType]]
+    solution: list[list[CellValue]]
+
+
+@dataclass
+class ImageRun:
+    latencies: dict[str, float] = field(default_factory=dict)
+    cells_correct: int = 0
+    connections_correct: int = 0
+    solved: bool = False
+    error: Optional[str] = None
+
+
+def load_ground_truth(path: str) -> GroundTruth:
+    """Reads a puzzle in the format written by `Puzzle.to_json` and solves it."""
+    with open(path) as file:
+        data = json.load(file)
+
+    grid = [
+        [
+            Cell(i, j, SymbolType[value] if value is not None else None)
+            for j, value in enumerate(row)
+        ]
+        for i, row in enumerate(data["grid"])
+    ]
+    cells = [cell.value for row in grid for cell in row]
+    vertical_connections: list[Optional[ConnectionType]] = [None] * 30
+    horizontal_connections: list[Optional[ConnectionType]] = [None] * 30
+    puzzle_connections = []
+
+    for connection in data["connections"]:
+        src, dst = connection["src"], connection["dst"]
+        row, col = min(src["row"], dst["row"]), min(src["col"], dst["col"])
+        connection_type = ConnectionType[connection["type"]]
+
+        if src["row"] == dst["row"]:
+            vertical_connections[row * 5 + col] = connection_type
+        else:
+            horizontal_connections[row * 6 + col] = connection_type
+
+        puzzle_connections.append(
+            create_connection(
+                grid[src["row"]][src["col"]],
+                grid[dst["row"]][dst["col"]],
+                connection_type,
+            )
+        )
+
+    puzzle = Puzzle(grid, puzzle_connections)
+    puzzle.solve()
+
+    return GroundTruth(
+        cells, vertical_connections, horizontal_connections, puzzle.values()
+    )
+
+
+def find_corpus(corpus_dir: str) -> list[tuple[str, str]]:
+    images = []
+
+    for ext in ALLOWED_EXTENSIONS:
+        for image_path in glob.glob(f"{corpus_dir}/*{ext}"):
+            truth_path = f"{os.path.splitext(image_path)[0]}.json"
+
+            if os.path.exists(truth_path):
+                images.append((image_path, truth_path))
+
+    return sorted(images)
+
+
+def run_image(image_path: str, truth: GroundTruth) -> ImageRun:
+    """Runs the pipeline on one image, timing each of its stages.
+
+    The stages are the ones `PuzzleImageSolverPipeline.run` goes through,
+    called one at a time so that the recognition is scored before repair and
+    solving, whether or not they succeed.
+    """
+    run = ImageRun()
+
+    def record(stage: str, latency: float):
+        run.latencies[stage] = latency
+
+    def timed(stage: str, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        record(stage, time.perf_counter() - start)
+
+        return result
+
+    image = timed("decode", cv2.imread, image_path)
+
+    if image is None:
+        run.error = "Could not load image."
+        return run
+
+    pipeline = PuzzleImageSolverPipeline(image, stage_hook=record)
+
+    try:
+        result = timed("find", pipeline.extract_puzzle_image, image)
+    except FinderError as error:
+        run.error = str(error)
+        return run
+
+    recognition = timed("recognize", pipeline.recognize, result.image)
+    vertical, horizontal = recognition.connections
+
+    run.cells_correct = sum(
+        map_shape_to_symbol(shape) == expected
+        for shape, expected in zip(recognition.shapes, truth.cells)
+    )
+    run.connections_correct = sum(
+        map_connection_to_connection_type(symbol) == expected
+        for symbol, expected in zip(
+            vertical + horizontal,
+            truth.vertical_connections + truth.horizontal_connections,
+        )
+    )
+
+    try:
+        solved = pipeline.solve_recognition(result, recognition)
+    except (SolverError, PuzzleError) as error:
+        run.error = str(error)
+        return run
+
+    run.solved = solved.puzzle.values() == truth.solution
+
+    if not run.solved:
+        run.error = "Solution does not match the ground truth."
+
+    return run
+
+
+def summarize_latencies(values: list[float]) -> dict[str, float]:
+    milliseconds = np.array(values) * 1000
+    summary = {"mean": float(milliseconds.mean())}
+
+    for percentile in PERCENTILES:
+        summary[f"p{percentile}"] = float(np.percentile(milliseconds, percentile))
+
+    return summary
+
+
+def measure_peak_memory(corpus: list[tuple[str, str, GroundTruth]]) -> float:
+    """Peak traced allocations, in MiB, over one pass of the corpus."""
+    tracemalloc.start()
+
+    for image_path, _, truth in corpus:
+        run_image(image_path, truth)
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return peak / 2**20
+
+
+def max_rss() -> float:
+    """Peak resident set size of this process, in MiB."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, macOS bytes.
+    if sys.platform == "darwin":
+        return max_rss / 2**20
+
+    return max_rss / 1024
+
+
+def run_benchmark(corpus_dir: str, repeat: int) -> dict:
+    corpus = [
+        (image_path, truth_path, load_ground_truth(truth_path))
+        for image_path, truth_path in find_corpus(corpus_dir)
+    ]
+
+    if len(corpus) == 0:
+        raise ValueError(f"No images with ground truth found in: {corpus_dir}")
+
+    latencies: dict[str, list[float]] = {stage: [] for stage in STAGES}
+    totals = []
+    runs: dict[str, ImageRun] = {}
+
+    for _ in range(repeat):
+        for image_path, _, truth in corpus:
+            run = run_image(image_path, truth)
+            runs[image_path] = run
+
+            for stage, latency in run.latencies.items():
+                latencies[stage].append(latency)
+
+            totals.append(sum(run.latencies.values()))
+
+    count = len(corpus)
+
+    return {
+        "corpus": corpus_dir,
+        "images": count,
+        "repeat": repeat,
+        "latency_ms": {
+            stage: summarize_latencies(values)
+            for stage, values in latencies.items()
+            if len(values) > 0
+        },
+        "throughput": {"images_per_second": len(totals) / sum(totals)},
+        "memory_mb": {
+            "peak_traced": measure_peak_memory(corpus),
+            "max_rss": max_rss(),
+        },
+        "accuracy": {
+            "cells": sum(run.cells_correct for run in runs.values()) / (count * 36),
+            "connections": sum(run.connections_correct for run in runs.values())
+            / (count * 60),
+            "solved": sum(run.solved for run in runs.values()) / count,
+        },
+        "errors": {path: run.error for path, run in runs.items() if run.error},
+    }
+
+
+def flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    metrics = {}
+
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = value
+
+    return metrics
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Prints a metric by metric comparison and returns the regressions."""
+    current_metrics = flatten(results)
+    baseline_metrics = flatten(baseline)
+    regressions = []
+
+    for name in ("latency_ms", "throughput", "memory_mb", "accuracy"):
+        for metric, current in current_metrics.items():
+            if not metric.startswith(name) or metric not in baseline_metrics:
+                continue
+
+            previous = baseline_metrics[metric]
+            change = (current - previous) / previous if previous else 0.0
+            higher_is_better = metric.startswith(HIGHER_IS_BETTER)
+            worse = -change if higher_is_better else change
+            allowed = 0.0 if metric.startswith("accuracy") else tolerance
+
+            status = ""
+
+            if worse > allowed:
+                status = "REGRESSION"
+                regressions.append(metric)
+
+            print(
+                f"{metric:32} {previous:12.3f} {current:12.3f} "
+                f"{change * 100:+8.1f}% {status}"
+            )
+
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Measure speed and accuracy of the puzzle image pipeline."
+    )
+
+    parser.add_argument(
+        "--corpus",
+        type=str,
+        default="data",
+        help="Directory of images, each with a ground truth <name>.json.",
+    )
+
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of passes over the corpus for latency statistics.",
+    )
+
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="File to write the results to, as JSON.",
+    )
+
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        help="Results file to compare against.",
+    )
+
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Relative slowdown allowed before a metric counts as a regression.",
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = run_benchmark(args.corpus, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=4)
+    else:
+        print(json.dumps(results, indent=4))
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
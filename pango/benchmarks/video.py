@@ -0,0 +1,132 @@
+import argparse
+import math
+import statistics
+import time
+
+import cv2
+from cv2.typing import MatLike
+import numpy as np
+
+from pango.image_processing.cell_images_extractor import CellImagesExtractor
+from pango.image_processing.connection_classifier import ConnectionClassifier
+from pango.image_processing.connection_images_extractor import ConnectionImagesExtractor
+from pango.image_processing.puzzle_image_finder import (
+    NoPuzzleFoundError,
+    PuzzleImageFinder,
+)
+from pango.image_processing.shape_classifier import ShapeClassifier
+from pango.video_solver import VideoPuzzleSolver, open_frames
+
+DEFAULT_IMAGE = "data/sample.jpg"
+DEFAULT_FRAMES = 120
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compare the streaming video solver with per-frame detection."
+    )
+
+    parser.add_argument(
+        "--input",
+        type=str,
+        help="Video file to replay. Defaults to a clip synthesized from --image.",
+    )
+
+    parser.add_argument(
+        "--image",
+        type=str,
+        default=DEFAULT_IMAGE,
+        help="Still image used to synthesize a hand-held clip.",
+    )
+
+    parser.add_argument(
+        "--frames",
+        type=int,
+        default=DEFAULT_FRAMES,
+        help="Number of frames to synthesize.",
+    )
+
+    return parser.parse_args()
+
+
+def synthesize_clip(image: MatLike, count: int) -> list[MatLike]:
+    """Simulates a hand-held camera with a slow drift, rotation and noise."""
+    height, width = image.shape[:2]
+    rng = np.random.default_rng(0)
+    frames = []
+
+    for i in range(count):
+        angle = 1.5 * math.sin(i / 25)
+        shift_x = 12 * math.sin(i / 15)
+        shift_y = 8 * math.cos(i / 20)
+
+        transform = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        transform[:, 2] += (shift_x, shift_y)
+
+        frame = cv2.warpAffine(
+            image, transform, (width, height), borderMode=cv2.BORDER_REPLICATE
+        )
+        noise = rng.normal(0, 3, frame.shape)
+        frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+        frames.append(frame)
+
+    return frames
+
+
+def run_per_frame_detection(frame: MatLike):
+    try:
+        board = PuzzleImageFinder(frame).find().image
+    except NoPuzzleFoundError:
+        return
+
+    vertical, horizontal = ConnectionImagesExtractor(board).extract()
+
+    [ShapeClassifier(cell).classify() for cell in CellImagesExtractor(board).extract()]
+    [ConnectionClassifier(conn).classify() for conn in vertical + horizontal]
+
+
+def summarize(name: str, latencies: list[float]):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    print(
+        f"{name}: {len(latencies) / sum(latencies):.1f} fps, "
+        f"mean {statistics.mean(latencies) * 1000:.1f} ms, "
+        f"p95 {p95 * 1000:.1f} ms"
+    )
+
+
+def main():
+    args = parse_args()
+
+    if args.input:
+        frames = list(open_frames(args.input))
+    else:
+        frames = synthesize_clip(cv2.imread(args.image), args.frames)
+
+    latencies = []
+
+    for frame in frames:
+        start = time.perf_counter()
+        run_per_frame_detection(frame)
+        latencies.append(time.perf_counter() - start)
+
+    summarize("Per-frame detection", latencies)
+
+    solver = VideoPuzzleSolver()
+    results = list(solver.run(frames))
+
+    summarize("Streaming solver", [result.elapsed for result in results])
+
+    detections = sum(result.detected for result in results)
+    reclassified = sum(result.reclassified for result in results)
+
+    print(
+        f"Streaming solver: {detections} detections, "
+        f"{reclassified / len(results):.1f} crops classified per frame"
+    )
+
+
+if __name__ == "__main__":
+    main()
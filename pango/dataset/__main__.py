@@ -1,12 +1,7 @@
+# OpenCV and the vision modules are imported where they are used, so argument
+# errors and --help return without loading them.
 import argparse
 
-import cv2
-
-from pango.dataset.interactive_dataset_classifier import InteractiveDatasetClassifier
-from pango.image_processing.cell_images_extractor import CellImagesExtractor
-from pango.image_processing.connection_images_extractor import ConnectionImagesExtractor
-from pango.image_processing.puzzle_image_finder import PuzzleImageFinder
-
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -28,11 +23,19 @@ def parse_args():
         help="List of class names for classification.",
     )
 
-    parser.add_argument(
+    input_group = parser.add_mutually_exclusive_group(required=True)
+
+    input_group.add_argument(
         "--input",
         type=str,
-        required=True,
-        help="Path to the input image file.",
+        nargs="+",
+        help="Paths to the input image files.",
+    )
+
+    input_group.add_argument(
+        "--input-dir",
+        type=str,
+        help="Directory of screenshots to auto-label in bulk.",
     )
 
     parser.add_argument(
@@ -41,10 +44,36 @@ def parse_args():
         help="Whether to classify connection images instead of cell images.",
     )
 
+    parser.add_argument(
+        "--label-map",
+        type=str,
+        nargs="+",
+        default=[],
+        help=(
+            "Bulk mode: symbol=class pairs mapping classifier output to classes, "
+            "e.g. sun=sun moon=moon unknown=blank or vertical:equal=ev."
+        ),
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Bulk mode: number of screenshots processed in parallel.",
+    )
+
+    parser.add_argument(
+        "--no-review",
+        action="store_true",
+        help="Bulk mode: skip the interactive review of uncertain crops.",
+    )
+
     return parser.parse_args()
 
 
 def load_image(file_path: str):
+    import cv2
+
     image = cv2.imread(file_path)
 
     if image is None:
@@ -53,17 +82,70 @@ def load_image(file_path: str):
     return image
 
 
+def extract_images(file_paths: list[str], connections: bool):
+    """Lazily yields normalized crops, one input image after another."""
+    from pango.image_processing.cell_images_extractor import CellImagesExtractor
+    from pango.image_processing.connection_images_extractor import (
+        ConnectionImagesExtractor,
+    )
+    from pango.image_processing.image_normalizer import normalize_image
+    from pango.image_processing.puzzle_image_finder import (
+        NoPuzzleFoundError,
+        PuzzleImageFinder,
+    )
+
+    for file_path in file_paths:
+        try:
+            puzzle_image = PuzzleImageFinder(load_image(file_path)).find().image
+        except NoPuzzleFoundError:
+            print(f"Skipping {file_path}: no puzzle found")
+            continue
+
+        if connections:
+            vertical, horizontal = ConnectionImagesExtractor(puzzle_image).crop()
+            crops = vertical + horizontal
+        else:
+            crops = CellImagesExtractor(puzzle_image).crop()
+
+        for crop in crops:
+            yield normalize_image(crop)
+
+
+def label_in_bulk(args):
+    from pango.dataset.bulk_dataset_labeler import BulkDatasetLabeler, parse_label_map
+    from pango.dataset.interactive_dataset_classifier import (
+        InteractiveDatasetClassifier,
+    )
+
+    labeler = BulkDatasetLabeler(
+        args.input_dir,
+        args.output,
+        args.classes,
+        parse_label_map(args.label_map),
+        connections=args.connections,
+        workers=args.workers,
+    )
+    images = labeler.label()
+
+    if args.no_review or len(images) == 0:
+        return
+
+    classifier = InteractiveDatasetClassifier(images, args.output, args.classes)
+    classifier.classify()
+
+
 def main():
     args = parse_args()
-    image = load_image(args.input)
 
-    puzzle_image = PuzzleImageFinder(image).find().image
+    if args.input_dir is not None:
+        label_in_bulk(args)
+        return
+
+    from pango.dataset.interactive_dataset_classifier import (
+        InteractiveDatasetClassifier,
+    )
 
-    if args.connections:
-        connections = ConnectionImagesExtractor(puzzle_image).extract()
-        images = connections[0] + connections[1]
-    else:
-        images = CellImagesExtractor(puzzle_image).extract()
+    images = extract_images(args.input, args.connections)
 
     classifier = InteractiveDatasetClassifier(images, args.output, args.classes)
     classifier.classify()
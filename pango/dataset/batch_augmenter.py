@@ -0,0 +1,252 @@
+import json
+import math
+import os
+
+import cv2
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from pango.dataset.dataset_packer import CHUNK_SIZE
+from pango.dataset.packed_dataset import (
+    CLASSES_FILENAME,
+    IMAGES_FILENAME,
+    LABELS_FILENAME,
+    PackedDataset,
+)
+
+# OpenCV filters accept at most this many channels, which is how many images
+# are blurred together in one call.
+MAXIMUM_CHANNELS = 512
+# `cv2.remap` stores coordinates as 16-bit fixed point, which bounds how tall a
+# mosaic of images can be.
+MAXIMUM_REMAP_ROWS = 32767
+
+BLUR_SIGMAS = (0.8, 1.0, 1.3)
+THRESHOLD_BLOCK_SIZES = (7, 9, 11, 13, 15)
+THRESHOLD_C_RANGE = (2, 6)
+
+
+def gaussian_blur_stack(images: np.ndarray, block_size: int, sigma: float = 0):
+    """Blurs (N, H, W) images by stacking them as channels of one image."""
+    blurred = np.empty(images.shape, dtype=np.float32)
+
+    for start in range(0, len(images), MAXIMUM_CHANNELS):
+        chunk = images[start : start + MAXIMUM_CHANNELS].astype(np.float32)
+        stacked = np.ascontiguousarray(chunk.transpose(1, 2, 0))
+        result = cv2.GaussianBlur(stacked, (block_size, block_size), sigma)
+
+        blurred[start : start + len(chunk)] = result.reshape(stacked.shape).transpose(
+            2, 0, 1
+        )
+
+    return blurred
+
+
+class BatchAugmenter:
+    """Randomly perturbs batches of normalized (N, H, W) crops.
+
+    Each image gets a random affine jitter (rotation, scale, shear) plus a
+    random offset that mimics the bounding box found by `ImageNormalizer.trim`
+    landing a few pixels off, then Gaussian noise and a blur of random width,
+    which together resemble the correlated noise of a camera. The result
+    is binarized again with the adaptive Gaussian threshold used by
+    `ImageNormalizer`, with a random block size and offset per image, so the
+    stroke widths vary the way they do between real captures.
+
+    Geometry and noise are computed for the whole batch at once with NumPy;
+    blurring and thresholding run as one OpenCV call per parameter group.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        max_rotation: float = 8.0,
+        max_scale: float = 0.1,
+        max_shear: float = 0.05,
+        max_trim_offset: float = 3.0,
+        noise_std: float = 4.0,
+        blur_sigmas: tuple[float, ...] = BLUR_SIGMAS,
+        threshold_block_sizes: tuple[int, ...] = THRESHOLD_BLOCK_SIZES,
+        threshold_c_range: tuple[int, int] = THRESHOLD_C_RANGE,
+    ):
+        self.max_rotation = max_rotation
+        self.max_scale = max_scale
+        self.max_shear = max_shear
+        self.max_trim_offset = max_trim_offset
+        self.noise_std = noise_std
+        self.blur_sigmas = blur_sigmas
+        self.threshold_block_sizes = threshold_block_sizes
+        self.threshold_c_range = threshold_c_range
+        self._rng = np.random.default_rng(seed)
+
+    def __call__(
+        self, batch: tuple[np.ndarray, np.ndarray]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        images, labels = batch
+
+        return self.augment(images), labels
+
+    def augment(self, images: np.ndarray) -> np.ndarray:
+        if len(images) == 0:
+            return images.copy()
+
+        output = self._jitter(images)
+        output = self._add_noise(output)
+        output = self._blur(output)
+
+        return self._threshold(output)
+
+    def expand(
+        self, images: np.ndarray, labels: np.ndarray, copies: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns `copies` augmented variants of every image."""
+        repeated = np.repeat(np.asarray(images), copies, axis=0)
+
+        return self.augment(repeated), np.repeat(np.asarray(labels), copies)
+
+    def _jitter(self, images: np.ndarray) -> np.ndarray:
+        count, height, width = images.shape
+        rng = self._rng
+
+        angle = np.radians(rng.uniform(-self.max_rotation, self.max_rotation, count))
+        scale = rng.uniform(1 - self.max_scale, 1 + self.max_scale, count)
+        shear = rng.uniform(-self.max_shear, self.max_shear, count)
+        offset = rng.uniform(-self.max_trim_offset, self.max_trim_offset, (count, 2))
+
+        # Inverse mapping: for every output pixel, where to sample the source.
+        cos = np.cos(angle) / scale
+        sin = np.sin(angle) / scale
+        center_x = (width - 1) / 2
+        center_y = (height - 1) / 2
+
+        ys, xs = np.mgrid[0:height, 0:width].astype(np.float32)
+        xs = xs[None] - center_x - offset[:, 0, None, None].astype(np.float32)
+        ys = ys[None] - center_y - offset[:, 1, None, None].astype(np.float32)
+
+        cos = cos.astype(np.float32)[:, None, None]
+        sin = sin.astype(np.float32)[:, None, None]
+        shear = shear.astype(np.float32)[:, None, None]
+
+        source_x = cos * xs + (sin + shear) * ys
+        source_y = -sin * xs + cos * ys
+
+        return self._sample(images, source_x + center_x, source_y + center_y)
+
+    def _sample(
+        self, images: np.ndarray, source_x: np.ndarray, source_y: np.ndarray
+    ) -> np.ndarray:
+        """Bilinear sampling of the whole batch with one `cv2.remap` per mosaic.
+
+        The images get a one pixel black frame and are stacked vertically into
+        a mosaic. Sampling positions are clamped onto each image's frame, so
+        nothing bleeds between neighbours and outside positions read black.
+        """
+        count, height, width = images.shape
+        tile_height = height + 2
+        per_mosaic = MAXIMUM_REMAP_ROWS // tile_height
+
+        padded = np.pad(np.asarray(images, dtype=np.uint8), ((0, 0), (1, 1), (1, 1)))
+        map_x = np.clip(source_x + 1, 0, width + 1)
+        map_y = np.clip(source_y + 1, 0, height + 1)
+        map_y += (np.arange(count, dtype=np.float32) * tile_height)[:, None, None]
+
+        output = np.empty((count, height, width), dtype=np.float32)
+
+        for start in range(0, count, per_mosaic):
+            end = min(start + per_mosaic, count)
+            mosaic = padded[start:end].reshape(-1, width + 2)
+            offset = np.float32(start * tile_height)
+
+            sampled = cv2.remap(
+                mosaic,
+                map_x[start:end].reshape(-1, width),
+                (map_y[start:end] - offset).reshape(-1, width),
+                cv2.INTER_LINEAR,
+            )
+
+            output[start:end] = sampled.reshape(end - start, height, width)
+
+        return output
+
+    def _blur(self, images: np.ndarray) -> np.ndarray:
+        sigmas = self._rng.choice(len(self.blur_sigmas), len(images))
+
+        for i, sigma in enumerate(self.blur_sigmas):
+            selected = np.flatnonzero(sigmas == i)
+
+            if len(selected) == 0:
+                continue
+
+            block_size = 2 * math.ceil(3 * sigma) + 1
+            images[selected] = gaussian_blur_stack(images[selected], block_size, sigma)
+
+        return images
+
+    def _add_noise(self, images: np.ndarray) -> np.ndarray:
+        noise = self._rng.standard_normal(images.shape, dtype=np.float32)
+        images += noise * np.float32(self.noise_std)
+
+        return np.clip(images, 0, 255, out=images)
+
+    def _threshold(self, images: np.ndarray) -> np.ndarray:
+        """Same rule as `cv2.adaptiveThreshold` in `ImageNormalizer`, inverted.
+
+        The normalizer marks dark pixels below the local Gaussian mean minus C;
+        on the inverted crops that is bright pixels above the mean plus C.
+        """
+        count = len(images)
+        block_indices = self._rng.choice(len(self.threshold_block_sizes), count)
+        low, high = self.threshold_c_range
+        c = self._rng.integers(low, high + 1, count).astype(np.float32)
+
+        local_mean = np.empty_like(images)
+
+        for i, block_size in enumerate(self.threshold_block_sizes):
+            selected = np.flatnonzero(block_indices == i)
+
+            if len(selected) > 0:
+                local_mean[selected] = gaussian_blur_stack(images[selected], block_size)
+
+        foreground = images >= local_mean + c[:, None, None]
+
+        return np.where(foreground, 255, 0).astype(np.uint8)
+
+
+def write_augmented_dataset(
+    dataset: PackedDataset,
+    output_dir: str,
+    augmenter: BatchAugmenter,
+    copies: int,
+    chunk_size: int = CHUNK_SIZE,
+):
+    """Packs `copies` augmented variants of every image of a packed dataset."""
+    os.makedirs(output_dir, exist_ok=True)
+
+    count = len(dataset) * copies
+    images = open_memmap(
+        f"{output_dir}/{IMAGES_FILENAME}",
+        mode="w+",
+        dtype=np.uint8,
+        shape=(count,) + dataset.images.shape[1:],
+    )
+    labels = open_memmap(
+        f"{output_dir}/{LABELS_FILENAME}",
+        mode="w+",
+        dtype=np.int32,
+        shape=(count,),
+    )
+
+    for start in range(0, len(dataset), chunk_size):
+        end = min(start + chunk_size, len(dataset))
+        chunk_images, chunk_labels = augmenter.expand(
+            dataset.images[start:end], dataset.labels[start:end], copies
+        )
+
+        images[start * copies : end * copies] = chunk_images
+        labels[start * copies : end * copies] = chunk_labels
+
+    images.flush()
+    labels.flush()
+
+    with open(f"{output_dir}/{CLASSES_FILENAME}", "w") as file:
+        json.dump(dataset.classes, file, indent=4)
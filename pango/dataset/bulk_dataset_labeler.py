@@ -0,0 +1,172 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+import glob
+import os
+
+import cv2
+from cv2.typing import MatLike
+
+from pango.dataset.dataset_packer import ALLOWED_EXTENSIONS
+from pango.dataset.interactive_dataset_classifier import save_labeled_image
+from pango.dataset.labeled_image_index import LabeledImageIndex, image_hash
+from pango.image_processing.cell_images_extractor import CellImagesExtractor
+from pango.image_processing.connection_classifier import ConnectionClassifier
+from pango.image_processing.connection_images_extractor import ConnectionImagesExtractor
+from pango.image_processing.image_normalizer import ImageNormalizer
+from pango.image_processing.puzzle_image_finder import (
+    NoPuzzleFoundError,
+    PuzzleImageFinder,
+)
+from pango.image_processing.shape_classifier import ShapeClassifier
+
+# Threshold settings (block size, C) a crop is classified under. The first one
+# is the pipeline's own and produces the image that is saved.
+NORMALIZATION_VARIANTS = [(11, 2), (9, 2), (13, 3)]
+
+
+@dataclass
+class LabeledCrop:
+    image: MatLike
+    symbol: str
+    confident: bool
+
+
+def parse_label_map(entries: list[str]) -> dict[str, str]:
+    label_map = {}
+
+    for entry in entries:
+        symbol, separator, class_name = entry.partition("=")
+
+        if not separator or not symbol or not class_name:
+            raise ValueError(f"Invalid label mapping: {entry}")
+
+        label_map[symbol] = class_name
+
+    return label_map
+
+
+class BulkDatasetLabeler:
+    """Extracts and auto-labels crops from a directory of screenshots.
+
+    Every crop is classified by `ShapeClassifier` or `ConnectionClassifier`
+    under a few threshold settings of `ImageNormalizer`. When all settings
+    agree and the symbol maps to a class through `label_map`, the crop is
+    written straight into that class folder. Every other crop is returned so it
+    can be reviewed by hand. Crops already in the output's `LabeledImageIndex`
+    are skipped.
+
+    Cell symbols are `sun`, `moon` and `unknown`. Connection symbols are
+    `equal`, `different` and `blank`, prefixed with `vertical:` or
+    `horizontal:`, e.g. `vertical:equal`.
+    """
+
+    def __init__(
+        self,
+        input_dir: str,
+        output_dir: str,
+        classes: list[str],
+        label_map: dict[str, str],
+        connections: bool = False,
+        workers: Optional[int] = None,
+    ):
+        unknown_classes = set(label_map.values()) - set(classes)
+
+        if unknown_classes:
+            raise ValueError(f"Unknown classes in label map: {unknown_classes}")
+
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.classes = classes
+        self.label_map = label_map
+        self.connections = connections
+        self.workers = workers
+
+    def label(self) -> list[MatLike]:
+        for class_name in self.classes:
+            os.makedirs(f"{self.output_dir}/{class_name}", exist_ok=True)
+
+        index = LabeledImageIndex(self.output_dir)
+        review = []
+        review_hashes = set()
+        saved = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for crops in executor.map(self._label_screenshot, self._screenshots()):
+                for crop in crops:
+                    class_name = self.label_map.get(crop.symbol)
+                    filename = image_hash(crop.image)
+
+                    if filename in index or filename in review_hashes:
+                        continue
+
+                    if crop.confident and class_name is not None:
+                        save_labeled_image(
+                            self.output_dir, class_name, crop.image, index
+                        )
+                        saved += 1
+                    else:
+                        review.append(crop.image)
+                        review_hashes.add(filename)
+
+        print(f"Auto-labeled {saved} images, {len(review)} left for review")
+
+        return review
+
+    def _screenshots(self) -> list[str]:
+        paths = []
+
+        for ext in ALLOWED_EXTENSIONS:
+            paths.extend(glob.glob(f"{self.input_dir}/*{ext}"))
+
+        return sorted(paths)
+
+    def _label_screenshot(self, path: str) -> list[LabeledCrop]:
+        image = cv2.imread(path)
+
+        if image is None:
+            print(f"Skipping {path}: could not load image")
+            return []
+
+        try:
+            puzzle_image = PuzzleImageFinder(image).find().image
+        except NoPuzzleFoundError:
+            print(f"Skipping {path}: no puzzle found")
+            return []
+
+        if not self.connections:
+            return [
+                self._label_crop(crop, self._classify_cell)
+                for crop in CellImagesExtractor(puzzle_image).crop()
+            ]
+
+        vertical, horizontal = ConnectionImagesExtractor(puzzle_image).crop()
+
+        return [
+            self._label_crop(crop, self._classify_connection, "vertical:")
+            for crop in vertical
+        ] + [
+            self._label_crop(crop, self._classify_connection, "horizontal:")
+            for crop in horizontal
+        ]
+
+    def _label_crop(self, crop: MatLike, classify, prefix: str = "") -> LabeledCrop:
+        images = [
+            ImageNormalizer(
+                crop, threshold_block_size=block_size, threshold_c=c
+            ).normalize()
+            for block_size, c in NORMALIZATION_VARIANTS
+        ]
+        symbols = [classify(image) for image in images]
+
+        return LabeledCrop(
+            image=images[0],
+            symbol=prefix + symbols[0],
+            confident=len(set(symbols)) == 1,
+        )
+
+    def _classify_cell(self, image: MatLike) -> str:
+        return str(ShapeClassifier(image).classify())
+
+    def _classify_connection(self, image: MatLike) -> str:
+        return str(ConnectionClassifier(image).classify())
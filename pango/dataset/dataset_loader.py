@@ -0,0 +1,135 @@
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+
+from pango.dataset.packed_dataset import PackedDataset, load_packed_dataset
+from pango.dataset.prefetch import prefetch
+
+Batch = tuple[np.ndarray, np.ndarray]
+
+
+class DatasetLoader:
+    """Yields minibatches of a packed dataset as NumPy arrays.
+
+    Only the rows of the current batches are read from the memory-mapped
+    arrays. Batches are gathered on a background thread, up to `prefetch`
+    ahead of the consumer. With `shuffle`, every epoch uses a new permutation
+    derived from `seed` and the epoch number, so runs are reproducible. A
+    `transform`, such as a `BatchAugmenter`, is applied to every batch on the
+    prefetching thread.
+    """
+
+    def __init__(
+        self,
+        dataset: PackedDataset,
+        indices: Optional[np.ndarray] = None,
+        batch_size: int = 64,
+        shuffle: bool = True,
+        seed: int = 0,
+        prefetch: int = 2,
+        drop_last: bool = False,
+        transform: Optional[Callable[[Batch], Batch]] = None,
+    ):
+        self.dataset = dataset
+        self.indices = np.arange(len(dataset)) if indices is None else indices
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.prefetch = prefetch
+        self.drop_last = drop_last
+        self.transform = transform
+        self._epoch = 0
+
+    @staticmethod
+    def load(path: str, **kwargs) -> "DatasetLoader":
+        return DatasetLoader(load_packed_dataset(path), **kwargs)
+
+    @property
+    def classes(self) -> list[str]:
+        return self.dataset.classes
+
+    def split(
+        self, validation_ratio: float, seed: Optional[int] = None
+    ) -> tuple["DatasetLoader", "DatasetLoader"]:
+        """Splits into train and validation loaders, stratified by label.
+
+        Only the train loader keeps the `transform`, so augmentation never
+        changes what is measured on the validation split.
+        """
+        rng = np.random.default_rng(self.seed if seed is None else seed)
+        labels = np.asarray(self.dataset.labels[self.indices])
+
+        train_indices = []
+        validation_indices = []
+
+        for label in np.unique(labels):
+            label_indices = rng.permutation(self.indices[labels == label])
+            validation_count = int(round(len(label_indices) * validation_ratio))
+
+            validation_indices.append(label_indices[:validation_count])
+            train_indices.append(label_indices[validation_count:])
+
+        return (
+            self._with_indices(np.sort(np.concatenate(train_indices)), self.transform),
+            self._with_indices(np.sort(np.concatenate(validation_indices)), None),
+        )
+
+    def __len__(self) -> int:
+        if self.drop_last:
+            return len(self.indices) // self.batch_size
+
+        return -(-len(self.indices) // self.batch_size)
+
+    def __iter__(self) -> Iterator[Batch]:
+        batches = self._batch_indices()
+        self._epoch += 1
+
+        if self.prefetch <= 0:
+            for batch_indices in batches:
+                yield self._gather(batch_indices)
+
+            return
+
+        yield from prefetch(map(self._gather, batches), self.prefetch)
+
+    def _with_indices(
+        self,
+        indices: np.ndarray,
+        transform: Optional[Callable[[Batch], Batch]],
+    ) -> "DatasetLoader":
+        return DatasetLoader(
+            self.dataset,
+            indices=indices,
+            batch_size=self.batch_size,
+            shuffle=self.shuffle,
+            seed=self.seed,
+            prefetch=self.prefetch,
+            drop_last=self.drop_last,
+            transform=transform,
+        )
+
+    def _batch_indices(self) -> list[np.ndarray]:
+        indices = self.indices
+
+        if self.shuffle:
+            rng = np.random.default_rng((self.seed, self._epoch))
+            indices = rng.permutation(indices)
+
+        return [
+            indices[start : start + self.batch_size]
+            for start in range(0, len(self) * self.batch_size, self.batch_size)
+        ]
+
+    def _gather(self, batch_indices: np.ndarray) -> Batch:
+        # Sorted indices keep reads from the memory map sequential.
+        batch_indices = np.sort(batch_indices)
+
+        batch = (
+            np.asarray(self.dataset.images[batch_indices]),
+            np.asarray(self.dataset.labels[batch_indices]),
+        )
+
+        if self.transform is not None:
+            batch = self.transform(batch)
+
+        return batch
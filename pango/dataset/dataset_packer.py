@@ -1,28 +1,120 @@
-import cv2
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 import glob
-import pandas as pd
+import hashlib
+import json
+import os
+import numpy as np
+from numpy.lib import format as npy_format
+from numpy.lib.format import open_memmap
 
+from pango.dataset.packed_dataset import (
+    CLASSES_FILENAME,
+    IMAGES_FILENAME,
+    LABELS_FILENAME,
+)
 
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+OUTPUT_FORMATS = {"npy", "csv"}
+CHUNK_SIZE = 1024
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+class Error(Exception):
+    pass
+
+
+class ArrayHeaderGrowthError(Error):
+    def __init__(self, path: str):
+        super().__init__(f"Could not grow the array header in place: {path}")
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def append_to_array(path: str, rows: np.ndarray):
+    """Appends rows to a .npy file in place by growing its first axis.
+
+    NumPy pads array headers so the length along the first axis can grow
+    without moving the data, which makes appending a matter of writing the rows
+    at the end and rewriting the shape in the header.
+    """
+    with open(path, "r+b") as file:
+        version = npy_format.read_magic(file)
+
+        if version == (1, 0):
+            shape, fortran_order, dtype = npy_format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = npy_format.read_array_header_2_0(file)
+
+        header_length = file.tell()
+
+        file.seek(0, os.SEEK_END)
+        file.write(np.ascontiguousarray(rows, dtype=dtype).tobytes())
+
+        header = {
+            "descr": npy_format.dtype_to_descr(dtype),
+            "fortran_order": fortran_order,
+            "shape": (shape[0] + len(rows),) + tuple(shape[1:]),
+        }
+
+        file.seek(0)
+
+        if version == (1, 0):
+            npy_format.write_array_header_1_0(file, header)
+        else:
+            npy_format.write_array_header_2_0(file, header)
+
+        if file.tell() != header_length:
+            raise ArrayHeaderGrowthError(path)
 
 
 class DatasetPacker:
+    """Packs a directory of labeled crops into a single dataset.
+
+    The default `npy` format writes a directory holding `images.npy`, a uint8
+    array of shape (N, height, width), `labels.npy` with the class index of
+    each image and `classes.json` with the class names. Images are decoded and
+    written in chunks, so packing never holds the whole dataset in memory, and
+    the arrays can be read back with `np.load(..., mmap_mode="r")`. The `csv`
+    format writes one row per image with the label and the flattened pixels.
+
+    The `npy` output also keeps `manifest.json`, recording the hash, label and
+    row offset of every packed file. Later runs only decode files that are new
+    or changed: changed files are rewritten at their offset and new files are
+    appended. Removed files, or a change of classes or image size, trigger a
+    full repack. Decoding runs on a pool of `workers` threads.
+    """
+
     def __init__(
         self,
         input_dir: str,
         output_file: str,
         classes: list[str],
         image_size: tuple[int, int] = (64, 64),
+        output_format: str = "npy",
+        workers: Optional[int] = None,
     ):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+
         self.input_dir = input_dir
         self.output_file = output_file
         self.classes = classes
         self.image_size = image_size
+        self.output_format = output_format
+        self.workers = workers
 
     def pack(self):
-        class_images = self._load_classes_images()
+        if self.output_format == "csv":
+            class_images = self._load_classes_images()
 
-        self.export_classes_to_csv(class_images)
+            self.export_classes_to_csv(class_images)
+        else:
+            self.export_classes_to_npy()
 
     def _load_classes_images(self):
         class_images = {}
@@ -44,9 +136,11 @@ class DatasetPacker:
         for ext in ALLOWED_EXTENSIONS:
             image_paths.extend(glob.glob(f"{class_dir}/*{ext}"))
 
-        return image_paths
+        return sorted(image_paths)
 
     def _load_image(self, image_path: str):
+        import cv2
+
         image = cv2.imread(image_path)
 
         if image is None:
@@ -54,17 +148,222 @@ class DatasetPacker:
 
         return image
 
+    def _prepare_image(self, image: np.ndarray) -> np.ndarray:
+        import cv2
+
+        resized_image = cv2.resize(image, self.image_size)
+
+        return resized_image[:, :, 0]
+
+    def _load_prepared_image(self, image_path: str) -> np.ndarray:
+        return self._prepare_image(self._load_image(image_path))
+
+    def export_classes_to_npy(self):
+        labeled_filenames = [
+            (label, filename)
+            for label, class_name in enumerate(self.classes)
+            for filename in self._get_class_image_filenames(class_name)
+        ]
+
+        os.makedirs(self.output_file, exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            manifest = self._load_manifest()
+
+            if manifest is None or not self._update_npy(
+                executor, manifest, labeled_filenames
+            ):
+                self._write_npy(executor, labeled_filenames)
+
+    def _write_npy(
+        self, executor: ThreadPoolExecutor, labeled_filenames: list[tuple[int, str]]
+    ):
+        width, height = self.image_size
+        images = self._create_array(
+            IMAGES_FILENAME, np.uint8, (len(labeled_filenames), height, width)
+        )
+        labels = self._create_array(
+            LABELS_FILENAME, np.int32, (len(labeled_filenames),)
+        )
+
+        for start in range(0, len(labeled_filenames), CHUNK_SIZE):
+            chunk = labeled_filenames[start : start + CHUNK_SIZE]
+            end = start + len(chunk)
+
+            images[start:end] = list(
+                executor.map(self._load_prepared_image, [f for _, f in chunk])
+            )
+            labels[start:end] = [label for label, _ in chunk]
+
+        if isinstance(images, np.memmap):
+            images.flush()
+            labels.flush()
+
+        with open(f"{self.output_file}/{CLASSES_FILENAME}", "w") as file:
+            json.dump(self.classes, file, indent=4)
+
+        files = {}
+        records = executor.map(self._file_record, [f for _, f in labeled_filenames])
+
+        for offset, ((label, filename), record) in enumerate(
+            zip(labeled_filenames, records)
+        ):
+            files[self._manifest_key(filename)] = {
+                **record,
+                "label": label,
+                "offset": offset,
+            }
+
+        self._save_manifest(files)
+
+    def _update_npy(
+        self,
+        executor: ThreadPoolExecutor,
+        manifest: dict,
+        labeled_filenames: list[tuple[int, str]],
+    ) -> bool:
+        """Brings the packed arrays up to date, or returns False to repack."""
+        files = manifest["files"]
+        current_keys = {self._manifest_key(f) for _, f in labeled_filenames}
+
+        if any(key not in current_keys for key in files):
+            return False
+
+        records = list(
+            executor.map(
+                self._file_record,
+                [f for _, f in labeled_filenames],
+                [files.get(self._manifest_key(f)) for _, f in labeled_filenames],
+            )
+        )
+
+        changed = []
+        added = []
+
+        for (label, filename), record in zip(labeled_filenames, records):
+            entry = files.get(self._manifest_key(filename))
+
+            if entry is None:
+                added.append((label, filename, record))
+            elif entry["hash"] != record["hash"]:
+                changed.append((entry, filename, record))
+            else:
+                entry.update(record)
+
+        if len(changed) == 0 and len(added) == 0:
+            self._save_manifest(files)
+            return True
+
+        if len(changed) > 0:
+            images = np.load(f"{self.output_file}/{IMAGES_FILENAME}", mmap_mode="r+")
+            decoded = executor.map(
+                self._load_prepared_image, [f for _, f, _ in changed]
+            )
+
+            for (entry, _, record), image in zip(changed, decoded):
+                images[entry["offset"]] = image
+                entry.update(record)
+
+            images.flush()
+
+        offset = len(files)
+
+        for start in range(0, len(added), CHUNK_SIZE):
+            chunk = added[start : start + CHUNK_SIZE]
+            decoded = executor.map(self._load_prepared_image, [f for _, f, _ in chunk])
+
+            append_to_array(
+                f"{self.output_file}/{IMAGES_FILENAME}", np.array(list(decoded))
+            )
+            append_to_array(
+                f"{self.output_file}/{LABELS_FILENAME}",
+                np.array([label for label, _, _ in chunk]),
+            )
+
+            for label, filename, record in chunk:
+                files[self._manifest_key(filename)] = {
+                    **record,
+                    "label": label,
+                    "offset": offset,
+                }
+                offset += 1
+
+        self._save_manifest(files)
+
+        return True
+
+    def _file_record(self, image_path: str, entry: Optional[dict] = None) -> dict:
+        """Describes a file, reusing the known hash if its size and mtime match."""
+        stat = os.stat(image_path)
+
+        if (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime"] == stat.st_mtime_ns
+        ):
+            file_digest = entry["hash"]
+        else:
+            file_digest = file_hash(image_path)
+
+        return {"hash": file_digest, "size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+    def _manifest_key(self, image_path: str) -> str:
+        return os.path.relpath(image_path, self.input_dir)
+
+    def _load_manifest(self) -> Optional[dict]:
+        try:
+            with open(f"{self.output_file}/{MANIFEST_FILENAME}") as file:
+                manifest = json.load(file)
+
+            images = np.load(f"{self.output_file}/{IMAGES_FILENAME}", mmap_mode="r")
+            labels = np.load(f"{self.output_file}/{LABELS_FILENAME}", mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+        if (
+            manifest["classes"] != self.classes
+            or tuple(manifest["image_size"]) != tuple(self.image_size)
+            or len(images) != len(manifest["files"])
+            or len(labels) != len(manifest["files"])
+        ):
+            return None
+
+        return manifest
+
+    def _save_manifest(self, files: dict):
+        path = f"{self.output_file}/{MANIFEST_FILENAME}"
+        temporary_path = f"{path}.tmp"
+        manifest = {
+            "classes": self.classes,
+            "image_size": list(self.image_size),
+            "files": files,
+        }
+
+        with open(temporary_path, "w") as file:
+            json.dump(manifest, file)
+
+        os.replace(temporary_path, path)
+
+    def _create_array(self, filename: str, dtype, shape: tuple[int, ...]):
+        path = f"{self.output_file}/{filename}"
+
+        if shape[0] == 0:
+            np.save(path, np.zeros(shape, dtype=dtype))
+
+            return np.load(path)
+
+        return open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
     def export_classes_to_csv(self, class_images: dict):
+        import pandas as pd
+
         rows = []
 
         for class_name, images in class_images.items():
             for image in images:
                 row = [class_name]
 
-                resized_image = cv2.resize(image, self.image_size)
-                first_channel = resized_image[:, :, 0]
-
-                flattened = first_channel.flatten().tolist()
+                flattened = self._prepare_image(image).flatten().tolist()
 
                 row.extend(flattened)
 
@@ -81,7 +380,7 @@ class DatasetPacker:
 if __name__ == "__main__":
     packer = DatasetPacker(
         input_dir="dataset",
-        output_file="dataset.csv",
+        output_file="dataset",
         classes=["bh", "blank", "bv", "eh", "moon", "sun", "xh", "xv"],
     )
     packer.pack()
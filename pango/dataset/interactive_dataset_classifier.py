@@ -1,36 +1,104 @@
+from typing import Iterable, Iterator, Optional
 import os
 import cv2
 from cv2.typing import MatLike
-import hashlib
+
+from pango.dataset.labeled_image_index import LabeledImageIndex, image_hash
+from pango.dataset.prefetch import prefetch
+
+PREFETCH_SIZE = 256
+
+
+def save_labeled_image(
+    output_dir: str,
+    class_name: str,
+    image: MatLike,
+    index: Optional[LabeledImageIndex] = None,
+) -> str:
+    filename = image_hash(image)
+    path = f"{output_dir}/{class_name}/{filename}.png"
+
+    cv2.imwrite(path, image)
+
+    if index is not None:
+        index.add(filename)
+
+    return filename
 
 
 class InteractiveDatasetClassifier:
+    """Shows images one at a time and saves each into the class picked by key.
+
+    Images already labeled in `output_dir`, according to its
+    `LabeledImageIndex`, and repeats of an image earlier in the input are
+    skipped without being shown. The input is consumed on a background thread
+    up to `prefetch_size` images ahead, so a lazy input, such as a generator
+    extracting crops from several screenshots, is extracted while the reviewer
+    labels the previous images.
+    """
+
     def __init__(
         self,
-        input: list[MatLike],
+        input: Iterable[MatLike],
         output_dir: str,
         classes: list[str],
+        prefetch_size: int = PREFETCH_SIZE,
     ):
         self.input = input
         self.output_dir = output_dir
         self.classes = classes
+        self.prefetch_size = prefetch_size
+        self.index = LabeledImageIndex(output_dir)
 
     def classify(self):
         self.ensure_output_dirs_exist()
         self.start_classification(self.input)
 
-    def start_classification(self, images: list[MatLike]):
+    def start_classification(self, images: Iterable[MatLike]):
+        total = None
+
+        if isinstance(images, list):
+            images = list(self._unlabeled(images))
+            total = len(images)
+
+        pending = prefetch(self._unlabeled(images), self.prefetch_size)
+        shown: list[MatLike] = []
         curr = 0
 
-        while curr < len(images):
-            image = images[curr]
+        while True:
+            if curr == len(shown):
+                image = next(pending, None)
+
+                if image is None:
+                    break
+
+                # A copy of the image may have been labeled since it was
+                # prefetched.
+                if image_hash(image) in self.index:
+                    continue
+
+                shown.append(image)
+
+            image = shown[curr]
 
-            key = self.show_image(image, len(images), curr)
+            key = self.show_image(image, total, curr)
             curr = self.handle_user_input(key, image, curr)
 
-    def show_image(self, image: MatLike, total: int, index: int) -> int:
+    def _unlabeled(self, images: Iterable[MatLike]) -> Iterator[MatLike]:
+        seen = set()
+
+        for image in images:
+            filename = image_hash(image)
+
+            if filename not in self.index and filename not in seen:
+                seen.add(filename)
+                yield image
+
+    def show_image(self, image: MatLike, total: Optional[int], index: int) -> int:
+        position = f"{index + 1}/{total}" if total is not None else f"{index + 1}"
+
         cv2.imshow(
-            f"Image {index + 1}/{total} - Press 1-{len(self.classes)} to classify, n to skip, Esc to exit",
+            f"Image {position} - Press 1-{len(self.classes)} to classify, n to skip, Esc to exit",
             image,
         )
 
@@ -60,10 +128,7 @@ class InteractiveDatasetClassifier:
         raise ValueError(f"Invalid key: {key}")
 
     def save_image(self, image: MatLike, class_name: str):
-        filename = hashlib.sha256(image.tobytes()).hexdigest()
-        path = f"{self.output_dir}/{class_name}/{filename}.png"
-
-        cv2.imwrite(path, image)
+        filename = save_labeled_image(self.output_dir, class_name, image, self.index)
 
         print(f"Saved image to {filename}, size: {image.shape}, class: {class_name}")
 
@@ -0,0 +1,59 @@
+import glob
+import hashlib
+import os
+import threading
+
+from cv2.typing import MatLike
+
+INDEX_FILENAME = "index.txt"
+
+
+def image_hash(image: MatLike) -> str:
+    return hashlib.sha256(image.tobytes()).hexdigest()
+
+
+class LabeledImageIndex:
+    """Hashes of every image already labeled in an output directory.
+
+    The index lives in `index.txt`, one hash per line, and is read once when
+    created. New hashes are appended as images are saved. When the file is
+    missing, it is rebuilt from the image filenames in the class folders, so
+    deleting it is enough to resynchronize after removing images by hand.
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.path = f"{output_dir}/{INDEX_FILENAME}"
+        self._hashes: set[str] = set()
+        self._lock = threading.Lock()
+
+        if os.path.exists(self.path):
+            with open(self.path) as file:
+                self._hashes = {line.strip() for line in file if line.strip()}
+        else:
+            self._rebuild()
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, digest: str):
+        with self._lock:
+            if digest in self._hashes:
+                return
+
+            self._hashes.add(digest)
+
+            with open(self.path, "a") as file:
+                file.write(f"{digest}\n")
+
+    def _rebuild(self):
+        for path in glob.glob(f"{self.output_dir}/*/*.png"):
+            self._hashes.add(os.path.splitext(os.path.basename(path))[0])
+
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        with open(self.path, "w") as file:
+            file.writelines(f"{digest}\n" for digest in sorted(self._hashes))
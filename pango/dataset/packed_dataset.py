@@ -0,0 +1,31 @@
+from dataclasses import dataclass
+from typing import Optional
+import json
+
+import numpy as np
+
+IMAGES_FILENAME = "images.npy"
+LABELS_FILENAME = "labels.npy"
+CLASSES_FILENAME = "classes.json"
+
+
+@dataclass
+class PackedDataset:
+    images: np.ndarray
+    labels: np.ndarray
+    classes: list[str]
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+def load_packed_dataset(path: str, mmap_mode: Optional[str] = "r") -> PackedDataset:
+    """Opens a dataset written by `DatasetPacker` without parsing or copying it."""
+    with open(f"{path}/{CLASSES_FILENAME}") as file:
+        classes = json.load(file)
+
+    return PackedDataset(
+        images=np.load(f"{path}/{IMAGES_FILENAME}", mmap_mode=mmap_mode),
+        labels=np.load(f"{path}/{LABELS_FILENAME}", mmap_mode=mmap_mode),
+        classes=classes,
+    )
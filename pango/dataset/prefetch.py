@@ -0,0 +1,55 @@
+from typing import Iterable, Iterator, TypeVar
+import queue
+import threading
+
+T = TypeVar("T")
+
+
+def prefetch(items: Iterable[T], size: int) -> Iterator[T]:
+    """Iterates `items` on a background thread, staying up to `size` ahead.
+
+    Exceptions raised while producing items are re-raised to the consumer, and
+    the thread stops once the consumer stops iterating.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=size)
+    stop = threading.Event()
+    done = object()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except Exception as error:
+            put(error)
+            return
+
+        put(done)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item = buffer.get()
+
+            if item is done:
+                return
+
+            if isinstance(item, Exception):
+                raise item
+
+            yield item
+    finally:
+        stop.set()
+        producer.join()
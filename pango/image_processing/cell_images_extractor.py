@@ -1,16 +1,42 @@
-import cv2
+from concurrent.futures import Executor, Future
+from typing import Callable, Optional
 from cv2.typing import MatLike
 
-from pango.image_processing.image_normalizer import ImageNormalizer
+from pango.image_processing.image_normalizer import (
+    Label,
+    normalize_and_classify,
+    normalize_image,
+)
 
 PADDING_RATIO = 0.2
 
 
 class CellImagesExtractor:
-    def __init__(self, input: MatLike):
+    def __init__(self, input: MatLike, executor: Optional[Executor] = None):
         self.input = input
+        self.executor = executor
 
     def extract(self) -> list[MatLike]:
+        cells = self.crop()
+
+        if self.executor is not None:
+            return list(self.executor.map(normalize_image, cells))
+
+        return [normalize_image(cell) for cell in cells]
+
+    def submit(
+        self, classify: Callable[[MatLike], Label]
+    ) -> list[Future[tuple[MatLike, Label]]]:
+        """Submits one task per cell that normalizes and classifies it.
+
+        Returns without waiting, so other crops can be submitted alongside.
+        """
+        return [
+            self.executor.submit(normalize_and_classify, cell, classify)
+            for cell in self.crop()
+        ]
+
+    def crop(self) -> list[MatLike]:
         cells = []
 
         cell_width = self.input.shape[1] // 6
@@ -28,6 +54,4 @@ class CellImagesExtractor:
 
                 cells.append(cell)
 
-        cells = [ImageNormalizer(cell).normalize() for cell in cells]
-
         return cells
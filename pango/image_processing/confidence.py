@@ -0,0 +1,28 @@
+from typing import TypeVar
+import math
+
+Symbol = TypeVar("Symbol")
+
+
+def margin_confidence(margin: float) -> float:
+    """Maps a signed distance to a decision threshold onto (0, 1).
+
+    Margins are expected in units of the threshold's tolerance, so a margin of
+    one is a clear decision; zero sits on the threshold and gives 0.5.
+    """
+    return 1 / (1 + math.exp(-margin))
+
+
+def rank_by_margin(
+    margins: dict[Symbol, float], chosen: Symbol
+) -> list[tuple[Symbol, float]]:
+    """Ranks symbols by confidence, with the classifier's choice first.
+
+    The margins of a decision cascade are positive only for the symbol it
+    picks. The choice is still put first explicitly, so that ties on a
+    threshold rank the same way the classifier decides them.
+    """
+    return sorted(
+        ((symbol, margin_confidence(margin)) for symbol, margin in margins.items()),
+        key=lambda item: (item[0] != chosen, -item[1]),
+    )
@@ -1,15 +1,14 @@
 from cv2.typing import MatLike
-from enum import Enum
 import cv2
 
+from pango.image_processing.confidence import rank_by_margin
+from pango.image_processing.symbols import ConnectionSymbol
 
-class ConnectionSymbol(Enum):
-    EQUAL = 1
-    DIFFERENT = 2
-    BLANK = 3
-
-    def __str__(self):
-        return self.name.lower()
+EQUAL_MINIMUM_AREA = 50
+DIFFERENT_MINIMUM_VERTICES = 6
+DIFFERENT_MINIMUM_AREA = 100
+# Scale that turns area margins into units of a clear decision.
+AREA_SCALE = 25
 
 
 class ConnectionClassifier:
@@ -24,6 +23,60 @@ class ConnectionClassifier:
         else:
             return ConnectionSymbol.BLANK
 
+    def rank(self) -> list[tuple[ConnectionSymbol, float]]:
+        """Every symbol with a confidence, most likely first.
+
+        The first entry is always the result of `classify`, decided here from
+        the same contours. The equal sign is two bars, so its margin is how
+        clearly the second largest contour is above the minimum area and the
+        third largest below it.
+        """
+        contours, _ = cv2.findContours(
+            self.image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        )
+        areas = sorted((cv2.contourArea(contour) for contour in contours), reverse=True)
+        areas += [0.0] * (3 - len(areas))
+
+        equal_margin = (
+            min(areas[1] - EQUAL_MINIMUM_AREA, EQUAL_MINIMUM_AREA - areas[2])
+            / AREA_SCALE
+        )
+        different_margin = -DIFFERENT_MINIMUM_VERTICES
+        is_different = False
+
+        for contour in contours:
+            perimeter = cv2.arcLength(contour, True)
+            approx = cv2.approxPolyDP(contour, 0.04 * perimeter, True)
+            area = cv2.contourArea(contour)
+
+            is_different = is_different or (
+                len(approx) >= DIFFERENT_MINIMUM_VERTICES
+                and area > DIFFERENT_MINIMUM_AREA
+            )
+
+            different_margin = max(
+                different_margin,
+                min(
+                    len(approx) - DIFFERENT_MINIMUM_VERTICES + 0.5,
+                    (area - DIFFERENT_MINIMUM_AREA) / AREA_SCALE,
+                ),
+            )
+
+        margins = {
+            ConnectionSymbol.EQUAL: equal_margin,
+            ConnectionSymbol.DIFFERENT: min(-equal_margin, different_margin),
+            ConnectionSymbol.BLANK: min(-equal_margin, -different_margin),
+        }
+
+        if areas[1] > EQUAL_MINIMUM_AREA >= areas[2]:
+            symbol = ConnectionSymbol.EQUAL
+        elif is_different:
+            symbol = ConnectionSymbol.DIFFERENT
+        else:
+            symbol = ConnectionSymbol.BLANK
+
+        return rank_by_margin(margins, symbol)
+
     def is_equal(self, image: MatLike) -> bool:
         contours, _ = cv2.findContours(
             image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
@@ -32,7 +85,7 @@ class ConnectionClassifier:
         rectangles = [
             cv2.boundingRect(contour)
             for contour in contours
-            if cv2.contourArea(contour) > 50
+            if cv2.contourArea(contour) > EQUAL_MINIMUM_AREA
         ]
 
         return len(rectangles) == 2
@@ -47,7 +100,10 @@ class ConnectionClassifier:
             approx = cv2.approxPolyDP(contour, 0.04 * perimeter, True)
             area = cv2.contourArea(contour)
 
-            if len(approx) > 5 and area > 100:
+            if (
+                len(approx) >= DIFFERENT_MINIMUM_VERTICES
+                and area > DIFFERENT_MINIMUM_AREA
+            ):
                 return True
 
         return False
@@ -1,23 +1,65 @@
+from concurrent.futures import Executor, Future
+from typing import Callable, Optional
 from cv2.typing import MatLike
-from skimage.segmentation import clear_border
 
-from pango.image_processing.image_normalizer import ImageNormalizer
+from pango.image_processing.image_normalizer import (
+    Label,
+    normalize_and_classify,
+    normalize_image,
+)
 
 CONNECTION_WIDTH = 40
 CONNECTION_PADDING_RATIO = 0.25
 
 
 class ConnectionImagesExtractor:
-    def __init__(self, input: MatLike):
+    def __init__(self, input: MatLike, executor: Optional[Executor] = None):
         self.input = input
+        self.executor = executor
 
     def extract(self) -> tuple[list[MatLike], list[MatLike]]:
+        vertical_connections, horizontal_connections = self.crop()
+
+        if self.executor is not None:
+            vertical = self.executor.map(normalize_image, vertical_connections)
+            horizontal = self.executor.map(normalize_image, horizontal_connections)
+
+            return list(vertical), list(horizontal)
+
         return (
-            self._extract_vertical_connections(),
-            self._extract_horizontal_connections(),
+            [normalize_image(conn) for conn in vertical_connections],
+            [normalize_image(conn) for conn in horizontal_connections],
         )
 
-    def _extract_vertical_connections(self) -> list[MatLike]:
+    def submit(
+        self, classify: Callable[[MatLike], Label]
+    ) -> tuple[
+        list[Future[tuple[MatLike, Label]]], list[Future[tuple[MatLike, Label]]]
+    ]:
+        """Submits one task per connection that normalizes and classifies it.
+
+        Returns without waiting, so other crops can be submitted alongside.
+        """
+        vertical_connections, horizontal_connections = self.crop()
+
+        return (
+            [
+                self.executor.submit(normalize_and_classify, conn, classify)
+                for conn in vertical_connections
+            ],
+            [
+                self.executor.submit(normalize_and_classify, conn, classify)
+                for conn in horizontal_connections
+            ],
+        )
+
+    def crop(self) -> tuple[list[MatLike], list[MatLike]]:
+        return (
+            self._crop_vertical_connections(),
+            self._crop_horizontal_connections(),
+        )
+
+    def _crop_vertical_connections(self) -> list[MatLike]:
         connections = []
 
         for i in range(6):
@@ -32,11 +74,9 @@ class ConnectionImagesExtractor:
 
                 connections.append(connection)
 
-        connections = [ImageNormalizer(conn).normalize() for conn in connections]
-
         return connections
 
-    def _extract_horizontal_connections(self) -> list[MatLike]:
+    def _crop_horizontal_connections(self) -> list[MatLike]:
         connections = []
 
         for i in range(5):
@@ -51,6 +91,4 @@ class ConnectionImagesExtractor:
 
                 connections.append(connection)
 
-        connections = [ImageNormalizer(conn).normalize() for conn in connections]
-
         return connections
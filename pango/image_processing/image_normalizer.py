@@ -1,6 +1,11 @@
+from typing import Callable, TypeVar
 import cv2
 from cv2.typing import MatLike
-from skimage.segmentation import clear_border
+
+Label = TypeVar("Label")
+
+THRESHOLD_BLOCK_SIZE = 11
+THRESHOLD_C = 2
 
 
 class ImageNormalizer:
@@ -9,10 +14,14 @@ class ImageNormalizer:
         input: MatLike,
         output_size: tuple[int, int] = (64, 64),
         object_size: tuple[int, int] = (48, 48),
+        threshold_block_size: int = THRESHOLD_BLOCK_SIZE,
+        threshold_c: int = THRESHOLD_C,
     ):
         self.input = input
         self.output_size = output_size
         self.object_size = object_size
+        self.threshold_block_size = threshold_block_size
+        self.threshold_c = threshold_c
 
     def normalize(self) -> MatLike:
         output = self.convert_to_black_and_white(self.input)
@@ -27,8 +36,8 @@ class ImageNormalizer:
             255,
             cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
             cv2.THRESH_BINARY,
-            11,
-            2,
+            self.threshold_block_size,
+            self.threshold_c,
         )
 
         return cv2.bitwise_not(output)
@@ -63,3 +72,15 @@ class ImageNormalizer:
             borderType=cv2.BORDER_CONSTANT,
             value=[0, 0, 0],
         )
+
+
+def normalize_image(image: MatLike) -> MatLike:
+    return ImageNormalizer(image).normalize()
+
+
+def normalize_and_classify(
+    image: MatLike, classify: Callable[[MatLike], Label]
+) -> tuple[MatLike, Label]:
+    normalized = normalize_image(image)
+
+    return normalized, classify(normalized)
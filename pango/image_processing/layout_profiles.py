@@ -0,0 +1,69 @@
+from typing import Optional
+import json
+import os
+import threading
+
+from cv2.typing import MatLike
+import numpy as np
+
+
+def layout_key(image_shape: tuple[int, ...]) -> str:
+    height, width = image_shape[:2]
+
+    return f"{width}x{height}"
+
+
+class LayoutProfiles:
+    """Known puzzle corners per screenshot size, optionally persisted as JSON.
+
+    Screenshots taken on the same device place the board at the same pixels, so
+    the quad found for one image size is a good first guess for the next image
+    of that size.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._profiles: dict[str, list[list[int]]] = {}
+        self._lock = threading.Lock()
+
+        if self.path is not None and os.path.exists(self.path):
+            with open(self.path) as file:
+                self._profiles = json.load(file)
+
+    def get(self, image_shape: tuple[int, ...]) -> Optional[MatLike]:
+        corners = self._profiles.get(layout_key(image_shape))
+
+        if corners is None:
+            return None
+
+        return np.array(corners, dtype=np.int32).reshape(4, 1, 2)
+
+    def learn(self, image_shape: tuple[int, ...], contour: MatLike):
+        corners = contour.reshape(4, 2).tolist()
+        key = layout_key(image_shape)
+
+        with self._lock:
+            if self._profiles.get(key) == corners:
+                return
+
+            self._profiles[key] = corners
+            self._save()
+
+    def forget(self, image_shape: tuple[int, ...]):
+        with self._lock:
+            if self._profiles.pop(layout_key(image_shape), None) is not None:
+                self._save()
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def _save(self):
+        if self.path is None:
+            return
+
+        temporary_path = f"{self.path}.tmp"
+
+        with open(temporary_path, "w") as file:
+            json.dump(self._profiles, file, indent=4)
+
+        os.replace(temporary_path, self.path)
@@ -1,14 +1,16 @@
-from typing import Optional
+from typing import Iterator, Optional
 import cv2
 from cv2.typing import MatLike
-from imutils.perspective import four_point_transform
-from skimage.segmentation import clear_border
 from dataclasses import dataclass
 import math
+import numpy as np
+
+from pango.image_processing.layout_profiles import LayoutProfiles
 
 THRESHOLD_BLOCK_SIZE = 11
 THRESHOLD_C = 2
 MINIMUM_CONTOUR_AREA = 1000
+MINIMUM_BORDER_COVERAGE = 0.6
 
 
 class Error(Exception):
@@ -20,6 +22,61 @@ class NoPuzzleFoundError(Error):
         super().__init__(f"No puzzle found.")
 
 
+def clear_border(image: MatLike) -> MatLike:
+    """Blanks the foreground components that touch the image border."""
+    foreground = cv2.threshold(image, 127, 255, cv2.THRESH_BINARY)[1]
+    _, labels = cv2.connectedComponents(foreground, connectivity=8)
+    border_labels = np.unique(
+        np.concatenate([labels[0], labels[-1], labels[:, 0], labels[:, -1]])
+    )
+    border = np.isin(labels, border_labels[border_labels != 0])
+
+    return np.where(border, 0, foreground).astype(np.uint8)
+
+
+def perspective_transform(contour: MatLike) -> tuple[MatLike, tuple[int, int]]:
+    """Transform from an image onto the upright board outlined by `contour`.
+
+    Warps like imutils' `four_point_transform`, but returns the matrix and the
+    board size as (width, height) so that results can be mapped back.
+    """
+    # imutils pulls in SciPy, so it is only loaded once a puzzle is cut.
+    from imutils.perspective import order_points
+
+    top_left, top_right, bottom_right, bottom_left = corners = order_points(
+        contour.reshape(4, 2)
+    )
+
+    width = int(
+        max(
+            np.linalg.norm(bottom_right - bottom_left),
+            np.linalg.norm(top_right - top_left),
+        )
+    )
+    height = int(
+        max(
+            np.linalg.norm(top_right - bottom_right),
+            np.linalg.norm(top_left - bottom_left),
+        )
+    )
+    destination = np.array(
+        [[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]],
+        dtype=np.float32,
+    )
+
+    return (
+        cv2.getPerspectiveTransform(corners.astype(np.float32), destination),
+        (width, height),
+    )
+
+
+def warp_puzzle(image: MatLike, contour: MatLike) -> MatLike:
+    """Cuts the board outlined by `contour` out of `image`, upright."""
+    transform, size = perspective_transform(contour)
+
+    return cv2.warpPerspective(image, transform, size)
+
+
 def draw_contours(image: MatLike, contours: list[MatLike]) -> MatLike:
     for contour in contours:
         cv2.drawContours(image, [contour], -1, (0, 255, 0), 3)
@@ -29,17 +86,33 @@ def draw_contours(image: MatLike, contours: list[MatLike]) -> MatLike:
 
 @dataclass
 class ExtractedPuzzleImageResult:
-    def __init__(self, image: MatLike, enhanced: MatLike, contour: MatLike):
+    def __init__(
+        self,
+        image: MatLike,
+        enhanced: MatLike,
+        contour: MatLike,
+        transform: Optional[MatLike] = None,
+    ):
         self.image = image
         self.enhanced = enhanced
         self.contour = contour
+        self.transform = transform
 
 
 class PuzzleImageFinder:
-    def __init__(self, image: MatLike):
+    def __init__(
+        self, image: MatLike, layout_profiles: Optional[LayoutProfiles] = None
+    ):
         self.image = image
+        self.layout_profiles = layout_profiles
 
     def find(self) -> ExtractedPuzzleImageResult:
+        if self.layout_profiles is not None:
+            result = self._find_with_layout_profile()
+
+            if result is not None:
+                return result
+
         output = self._enhance_image(self.image.copy())
         contours = self._find_contours(output)
 
@@ -50,12 +123,82 @@ class PuzzleImageFinder:
 
         self._validate_grid(output, puzzle_contour)
 
+        if self.layout_profiles is not None:
+            self.layout_profiles.learn(self.image.shape, puzzle_contour)
+
+        return self._extract(output, puzzle_contour)
+
+    def find_all(self) -> list[ExtractedPuzzleImageResult]:
+        output = self._enhance_image(self.image.copy())
+        contours = self._find_contours(output)
+
+        results = []
+
+        for puzzle_contour in self._find_puzzle_contours(contours):
+            if cv2.contourArea(puzzle_contour) < MINIMUM_CONTOUR_AREA:
+                break
+
+            if any(self._overlaps(puzzle_contour, r.contour) for r in results):
+                continue
+
+            try:
+                self._validate_grid(output, puzzle_contour)
+            except NoPuzzleFoundError:
+                continue
+
+            results.append(self._extract(output, puzzle_contour))
+
+        if len(results) == 0:
+            raise NoPuzzleFoundError()
+
+        return results
+
+    def _find_with_layout_profile(self) -> Optional[ExtractedPuzzleImageResult]:
+        contour = self.layout_profiles.get(self.image.shape)
+
+        if contour is None:
+            return None
+
+        transform, size = perspective_transform(contour)
+        image = cv2.warpPerspective(self.image, transform, size)
+        enhanced = self._enhance_image(image)
+
+        if not self._has_border(enhanced):
+            return None
+
         return ExtractedPuzzleImageResult(
-            image=self._cut_puzzle(self.image, puzzle_contour),
-            enhanced=self._cut_puzzle(output, puzzle_contour),
-            contour=puzzle_contour,
+            image=image,
+            enhanced=enhanced,
+            contour=contour,
+            transform=transform,
         )
 
+    def _extract(
+        self, enhanced: MatLike, contour: MatLike
+    ) -> ExtractedPuzzleImageResult:
+        transform, size = perspective_transform(contour)
+
+        return ExtractedPuzzleImageResult(
+            image=cv2.warpPerspective(self.image, transform, size),
+            enhanced=cv2.warpPerspective(enhanced, transform, size),
+            contour=contour,
+            transform=transform,
+        )
+
+    def _has_border(self, image: MatLike) -> bool:
+        """Checks that the four edges of a warped puzzle are lined with strokes."""
+        height, width = image.shape[:2]
+        band = max(2, min(width, height) // 100)
+
+        edges = [
+            image[:band, :].any(axis=0),
+            image[height - band :, :].any(axis=0),
+            image[:, :band].any(axis=1),
+            image[:, width - band :].any(axis=1),
+        ]
+
+        return all(edge.mean() >= MINIMUM_BORDER_COVERAGE for edge in edges)
+
     def _enhance_image(self, image: MatLike) -> MatLike:
         gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         threshold_image = cv2.adaptiveThreshold(
@@ -77,12 +220,22 @@ class PuzzleImageFinder:
         return contours
 
     def _find_puzzle_contour(self, contours: list[MatLike]) -> Optional[MatLike]:
+        return next(self._find_puzzle_contours(contours), None)
+
+    def _find_puzzle_contours(self, contours: list[MatLike]) -> Iterator[MatLike]:
         for contour in contours:
             perimeter = cv2.arcLength(contour, True)
             approximation = cv2.approxPolyDP(contour, 0.005 * perimeter, True)
 
             if len(approximation) == 4:
-                return approximation
+                yield approximation
+
+    def _overlaps(self, contour: MatLike, other: MatLike) -> bool:
+        area, _ = cv2.intersectConvexConvex(
+            contour.astype("float32"), other.astype("float32")
+        )
+
+        return area > 0
 
     def _validate_grid(self, image: MatLike, contour: MatLike):
         puzzle_image = clear_border(self._cut_puzzle(image, contour))
@@ -104,4 +257,4 @@ class PuzzleImageFinder:
             raise NoPuzzleFoundError()
 
     def _cut_puzzle(self, image: MatLike, contour: MatLike) -> MatLike:
-        return four_point_transform(image, contour.reshape(4, 2))
+        return warp_puzzle(image, contour)
@@ -0,0 +1,91 @@
+from typing import Optional
+import cv2
+from cv2.typing import MatLike
+import numpy as np
+
+TRACKING_WINDOW_SIZE = (21, 21)
+TRACKING_PYRAMID_LEVELS = 3
+MAXIMUM_ROUND_TRIP_ERROR = 1.5
+MAXIMUM_AREA_CHANGE_RATIO = 0.2
+
+
+class QuadTracker:
+    """Follows the four corners of a detected quad from frame to frame.
+
+    Corners are tracked with pyramidal Lucas-Kanade optical flow and checked by
+    flowing them back to the previous frame. The quad is reported lost when a
+    corner cannot be followed, drifts on the round trip, or when the quad stops
+    being convex or changes area abruptly, so the caller can fall back to a full
+    detection.
+    """
+
+    def __init__(self):
+        self._previous_gray: Optional[MatLike] = None
+        self._corners: Optional[MatLike] = None
+
+    @property
+    def corners(self) -> Optional[MatLike]:
+        return self._corners
+
+    def reset(self, gray: MatLike, corners: MatLike):
+        self._previous_gray = gray
+        self._corners = corners.reshape(4, 1, 2).astype(np.float32)
+
+    def lose(self):
+        self._previous_gray = None
+        self._corners = None
+
+    def track(self, gray: MatLike) -> Optional[MatLike]:
+        if self._previous_gray is None or self._corners is None:
+            return None
+
+        corners, status, _ = cv2.calcOpticalFlowPyrLK(
+            self._previous_gray,
+            gray,
+            self._corners,
+            None,
+            winSize=TRACKING_WINDOW_SIZE,
+            maxLevel=TRACKING_PYRAMID_LEVELS,
+        )
+
+        if corners is None or not status.all():
+            self.lose()
+            return None
+
+        back_corners, back_status, _ = cv2.calcOpticalFlowPyrLK(
+            gray,
+            self._previous_gray,
+            corners,
+            None,
+            winSize=TRACKING_WINDOW_SIZE,
+            maxLevel=TRACKING_PYRAMID_LEVELS,
+        )
+
+        if back_corners is None or not back_status.all():
+            self.lose()
+            return None
+
+        round_trip_error = np.linalg.norm(back_corners - self._corners, axis=2).max()
+
+        if round_trip_error > MAXIMUM_ROUND_TRIP_ERROR or not self._is_plausible(
+            corners
+        ):
+            self.lose()
+            return None
+
+        self._previous_gray = gray
+        self._corners = corners
+
+        return corners.reshape(4, 2)
+
+    def _is_plausible(self, corners: MatLike) -> bool:
+        if not cv2.isContourConvex(corners):
+            return False
+
+        previous_area = cv2.contourArea(self._corners)
+        area = cv2.contourArea(corners)
+
+        if previous_area == 0:
+            return False
+
+        return abs(area - previous_area) / previous_area <= MAXIMUM_AREA_CHANGE_RATIO
@@ -1,16 +1,16 @@
 from cv2.typing import MatLike
-from enum import Enum
 import math
 import cv2
 
+from pango.image_processing.confidence import rank_by_margin
+from pango.image_processing.symbols import Shape
 
-class Shape(Enum):
-    SUN = 0
-    MOON = 1
-    UNKNOWN = 2
-
-    def __str__(self):
-        return self.name.lower()
+SUN_CIRCULARITY = 0.7
+MOON_MINIMUM_VERTICES = 6
+MOON_MINIMUM_AREA = 400
+# Scales that turn each margin into units of a clear decision.
+CIRCULARITY_SCALE = 0.1
+AREA_SCALE = 100
 
 
 class ShapeClassifier:
@@ -25,6 +25,60 @@ class ShapeClassifier:
         else:
             return Shape.UNKNOWN
 
+    def rank(self) -> list[tuple[Shape, float]]:
+        """Every shape with a confidence, most likely first.
+
+        The first entry is always the result of `classify`, decided here from
+        the same contours. Confidences follow from how far the best contour is
+        from the thresholds of each test.
+        """
+        contours = self._extract_contours(self.image)
+        sun_margin = -SUN_CIRCULARITY / CIRCULARITY_SCALE
+        moon_margin = -MOON_MINIMUM_VERTICES
+        is_sun = False
+        is_moon = False
+
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            perimeter = cv2.arcLength(contour, True)
+
+            if area == 0 or perimeter == 0:
+                continue
+
+            circularity = 4 * math.pi * (area / (perimeter * perimeter))
+            approx = cv2.approxPolyDP(contour, 0.04 * perimeter, True)
+
+            is_sun = is_sun or circularity > SUN_CIRCULARITY
+            is_moon = is_moon or (
+                len(approx) >= MOON_MINIMUM_VERTICES and area >= MOON_MINIMUM_AREA
+            )
+
+            sun_margin = max(
+                sun_margin, (circularity - SUN_CIRCULARITY) / CIRCULARITY_SCALE
+            )
+            moon_margin = max(
+                moon_margin,
+                min(
+                    len(approx) - MOON_MINIMUM_VERTICES + 0.5,
+                    (area - MOON_MINIMUM_AREA) / AREA_SCALE,
+                ),
+            )
+
+        margins = {
+            Shape.SUN: sun_margin,
+            Shape.MOON: min(-sun_margin, moon_margin),
+            Shape.UNKNOWN: min(-sun_margin, -moon_margin),
+        }
+
+        if is_sun:
+            shape = Shape.SUN
+        elif is_moon:
+            shape = Shape.MOON
+        else:
+            shape = Shape.UNKNOWN
+
+        return rank_by_margin(margins, shape)
+
     def _is_sun(self, image: MatLike) -> bool:
         contours = self._extract_contours(image)
 
@@ -41,7 +95,7 @@ class ShapeClassifier:
 
             circularity = 4 * math.pi * (area / (perimeter * perimeter))
 
-            if circularity > 0.7:
+            if circularity > SUN_CIRCULARITY:
                 return True
 
         return False
@@ -62,7 +116,7 @@ class ShapeClassifier:
 
             approx = cv2.approxPolyDP(contour, 0.04 * perimeter, True)
 
-            if len(approx) > 5 and area >= 400:
+            if len(approx) >= MOON_MINIMUM_VERTICES and area >= MOON_MINIMUM_AREA:
                 return True
 
         return False
@@ -0,0 +1,157 @@
+from typing import Optional
+import cv2
+from cv2.typing import MatLike
+import numpy as np
+
+from pango.puzzle import CellValue, SymbolType
+
+SUN_COLOR = (0, 170, 255)
+MOON_COLOR = (255, 150, 60)
+SYMBOL_SCALE = 0.6
+MOON_CUTOUT_OFFSET = 0.45
+
+
+class SolutionRenderer:
+    """Draws symbols onto the cells of a board seen in perspective.
+
+    Symbols are drawn on an upright board with straight cell edges, from
+    sprites rendered once per cell size, and the board is brought back onto
+    the image with one inverse perspective warp of colour and alpha together.
+    Only the image region under the board is touched. The last board overlay
+    is kept, so rendering an unchanged solution on every frame of a video only
+    costs the warp and the blend.
+    """
+
+    def __init__(
+        self,
+        sun_color: tuple[int, int, int] = SUN_COLOR,
+        moon_color: tuple[int, int, int] = MOON_COLOR,
+        symbol_scale: float = SYMBOL_SCALE,
+    ):
+        self.colors = {SymbolType.SUN: sun_color, SymbolType.MOON: moon_color}
+        self.symbol_scale = symbol_scale
+        self._sprites: dict[tuple[int, int], dict[SymbolType, MatLike]] = {}
+        self._overlay_key: Optional[tuple] = None
+        self._overlay: Optional[MatLike] = None
+
+    def render(
+        self,
+        image: MatLike,
+        transform: MatLike,
+        board_size: tuple[int, int],
+        symbols: list[list[CellValue]],
+    ) -> MatLike:
+        """Draws `symbols` into `image` and returns it.
+
+        `transform` maps the image onto the upright board of `board_size`,
+        given as (width, height), as returned by `perspective_transform`.
+        """
+        region = self._board_region(image, transform, board_size)
+
+        if region is None:
+            return image
+
+        x, y, width, height = region
+        overlay = self._board_overlay(board_size, symbols)
+
+        # Warping with the forward transform as the inverse map samples the
+        # board for every pixel of the image region, shifted to its origin.
+        shift = np.array([[1, 0, x], [0, 1, y], [0, 0, 1]], dtype=np.float64)
+        warped = cv2.warpPerspective(
+            overlay,
+            transform @ shift,
+            (width, height),
+            flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+        )
+
+        # Colours are premultiplied by alpha, so the blend is one saturating
+        # multiply and add in 8 bits.
+        target = image[y : y + height, x : x + width]
+        transparency = cv2.cvtColor(255 - warped[..., 3], cv2.COLOR_GRAY2BGR)
+        target[:] = cv2.add(
+            cv2.multiply(target, transparency, scale=1 / 255), warped[..., :3]
+        )
+
+        return image
+
+    def _board_region(
+        self, image: MatLike, transform: MatLike, board_size: tuple[int, int]
+    ) -> Optional[tuple[int, int, int, int]]:
+        width, height = board_size
+        board_corners = np.array(
+            [[[0, 0]], [[width - 1, 0]], [[width - 1, height - 1]], [[0, height - 1]]],
+            dtype=np.float32,
+        )
+        corners = cv2.perspectiveTransform(board_corners, np.linalg.inv(transform))
+
+        left, top = np.floor(corners.min(axis=(0, 1))).astype(int)
+        right, bottom = np.ceil(corners.max(axis=(0, 1))).astype(int) + 1
+
+        left, top = max(left, 0), max(top, 0)
+        right, bottom = min(right, image.shape[1]), min(bottom, image.shape[0])
+
+        if right <= left or bottom <= top:
+            return None
+
+        return left, top, right - left, bottom - top
+
+    def _board_overlay(
+        self, board_size: tuple[int, int], symbols: list[list[CellValue]]
+    ) -> MatLike:
+        """Premultiplied colour and alpha of the symbols on the upright board."""
+        key = (board_size, tuple(tuple(row) for row in symbols))
+
+        if key == self._overlay_key:
+            return self._overlay
+
+        width, height = board_size
+        cell_width = width // len(symbols[0])
+        cell_height = height // len(symbols)
+        sprites = self._cell_sprites(cell_width, cell_height)
+        overlay = np.zeros((height, width, 4), dtype=np.uint8)
+
+        for i, row in enumerate(symbols):
+            for j, symbol in enumerate(row):
+                if symbol is None:
+                    continue
+
+                x, y = j * cell_width, i * cell_height
+                overlay[y : y + cell_height, x : x + cell_width] = sprites[symbol]
+
+        self._overlay_key = key
+        self._overlay = overlay
+
+        return overlay
+
+    def _cell_sprites(self, width: int, height: int) -> dict[SymbolType, MatLike]:
+        sprites = self._sprites.get((width, height))
+
+        if sprites is None:
+            sprites = {
+                symbol: self._render_sprite(width, height, symbol)
+                for symbol in self.colors
+            }
+            self._sprites[(width, height)] = sprites
+
+        return sprites
+
+    def _render_sprite(self, width: int, height: int, symbol: SymbolType) -> MatLike:
+        mask = np.zeros((height, width), dtype=np.uint8)
+        center = (width // 2, height // 2)
+        radius = max(1, int(min(width, height) * self.symbol_scale / 2))
+
+        cv2.circle(mask, center, radius, 255, -1, cv2.LINE_AA)
+
+        if symbol == SymbolType.MOON:
+            offset = int(radius * MOON_CUTOUT_OFFSET)
+            cutout = (center[0] + offset, center[1] - offset)
+            cv2.circle(mask, cutout, radius, 0, -1, cv2.LINE_AA)
+
+        alpha = mask.astype(np.float32)[..., None] / 255
+        color = np.array(self.colors[symbol], dtype=np.float32)
+
+        sprite = np.empty((height, width, 4), dtype=np.uint8)
+        sprite[..., :3] = np.round(alpha * color)
+        sprite[..., 3] = mask
+
+        return sprite
@@ -0,0 +1,19 @@
+from enum import Enum
+
+
+class Shape(Enum):
+    SUN = 0
+    MOON = 1
+    UNKNOWN = 2
+
+    def __str__(self):
+        return self.name.lower()
+
+
+class ConnectionSymbol(Enum):
+    EQUAL = 1
+    DIFFERENT = 2
+    BLANK = 3
+
+    def __str__(self):
+        return self.name.lower()
@@ -189,6 +189,44 @@ class Puzzle:
 
         raise NoSolutionFound()
 
+    def count_solutions(self, limit: int = 2) -> int:
+        """Counts solutions, stopping at `limit`. The grid is left unchanged."""
+        if not self.is_valid():
+            return 0
+
+        empty_cells = self.empty_cells()
+
+        if len(empty_cells) == 0:
+            return 1
+
+        count = 0
+        stack = [(empty_cells[0], [SymbolType.SUN, SymbolType.MOON])]
+
+        while len(stack) > 0 and count < limit:
+            cell, symbols = stack[-1]
+
+            if len(symbols) == 0:
+                cell.value = None
+                stack.pop()
+                continue
+
+            cell.value = symbols.pop()
+
+            if not self.is_valid():
+                continue
+
+            next_cell = next_empty_cell(empty_cells)
+
+            if next_cell is None:
+                count += 1
+            else:
+                stack.append((next_cell, [SymbolType.SUN, SymbolType.MOON]))
+
+        for cell in empty_cells:
+            cell.value = None
+
+        return count
+
     def is_valid(self) -> bool:
         return PuzzleValidator(self).validate()
 
@@ -200,6 +238,14 @@ class Puzzle:
 
         return self.is_valid()
 
+    def values(self) -> list[list[CellValue]]:
+        return [[cell.value for cell in row] for row in self._grid]
+
+    def fill(self, values: list[list[CellValue]]):
+        for row, row_values in zip(self._grid, values):
+            for cell, value in zip(row, row_values):
+                cell.value = value
+
     def empty_cells(self) -> list[Cell]:
         return [cell for row in self._grid for cell in row if cell.is_empty()]
 
@@ -211,7 +257,7 @@ class Puzzle:
         return self._grid[index]
 
     def __repr__(self):
-        return str([[cell.value for cell in row] for row in self._grid])
+        return str(self.values())
 
     def to_json(self) -> str:
         grid_representation = [
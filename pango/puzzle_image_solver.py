@@ -1,18 +1,26 @@
-from typing import Optional
-import cv2
-from cv2.typing import MatLike
-
-from pango.image_processing.cell_images_extractor import CellImagesExtractor
-from pango.image_processing.connection_classifier import (
-    ConnectionSymbol,
-    ConnectionClassifier,
+from __future__ import annotations
+
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Callable, Optional
+import time
+
+# The vision modules load OpenCV and NumPy, so they are imported by the stages
+# that use them; importing the pipeline for its result types stays cheap.
+from pango.image_processing.symbols import ConnectionSymbol, Shape
+from pango.recognition_repair import (
+    REPAIR_BUDGET,
+    RecognitionRepair,
+    RepairNotFound,
+    RepairResult,
 )
-from pango.image_processing.connection_images_extractor import ConnectionImagesExtractor
-from pango.image_processing.puzzle_image_finder import (
-    ExtractedPuzzleImageResult,
-    PuzzleImageFinder,
+from pango.recognition_cache import (
+    RecognitionCache,
+    RecognitionCacheEntry,
+    recognition_key,
+    pixels_key,
 )
-from pango.image_processing.shape_classifier import Shape, ShapeClassifier
 from pango.puzzle import (
     Cell,
     CellValue,
@@ -20,11 +28,20 @@ from pango.puzzle import (
     ConnectionType,
     DifferentConnection,
     EqualConnection,
+    Error as PuzzleError,
     Puzzle,
     PuzzleGrid,
     SymbolType,
 )
 
+if TYPE_CHECKING:
+    from cv2.typing import MatLike
+
+    from pango.image_processing.layout_profiles import LayoutProfiles
+    from pango.image_processing.puzzle_image_finder import (
+        ExtractedPuzzleImageResult,
+    )
+
 SHAPE_MAPPING = {
     Shape.SUN: SymbolType.SUN,
     Shape.MOON: SymbolType.MOON,
@@ -46,6 +63,43 @@ def map_connection_to_connection_type(
     return CONNECTION_MAPPING.get(conn, None)
 
 
+def classify_shape(cell_image: MatLike) -> Shape:
+    from pango.image_processing.shape_classifier import ShapeClassifier
+
+    return ShapeClassifier(cell_image).classify()
+
+
+def classify_connection(connection_image: MatLike) -> ConnectionSymbol:
+    from pango.image_processing.connection_classifier import ConnectionClassifier
+
+    return ConnectionClassifier(connection_image).classify()
+
+
+def rank_shape(cell_image: MatLike) -> list[tuple[Shape, float]]:
+    from pango.image_processing.shape_classifier import ShapeClassifier
+
+    return ShapeClassifier(cell_image).rank()
+
+
+def rank_connection(
+    connection_image: MatLike,
+) -> list[tuple[ConnectionSymbol, float]]:
+    from pango.image_processing.connection_classifier import ConnectionClassifier
+
+    return ConnectionClassifier(connection_image).rank()
+
+
+def solved_cells(shapes: list[Shape], puzzle: Puzzle) -> list[list[CellValue]]:
+    """The solution of the cells that were empty on the recognized board."""
+    return [
+        [
+            value if map_shape_to_symbol(shapes[i * 6 + j]) is None else None
+            for j, value in enumerate(row)
+        ]
+        for i, row in enumerate(puzzle.values())
+    ]
+
+
 def create_connection(
     src: Cell, dst: Cell, connection_type: ConnectionType
 ) -> Connection:
@@ -69,42 +123,340 @@ class InvalidNumberOfConnections(Error):
         super().__init__(f"Invalid number of connections: {connections_count}.")
 
 
+@dataclass
+class PuzzleImageSolverResult:
+    image: MatLike
+    contour: MatLike
+    shapes: list[Shape]
+    connections: tuple[list[ConnectionSymbol], list[ConnectionSymbol]]
+    puzzle: Puzzle
+    repairs: int = 0
+    transform: Optional[MatLike] = None
+
+
+@dataclass
+class Recognition:
+    cell_images: list[MatLike]
+    connection_images: tuple[list[MatLike], list[MatLike]]
+    shapes: list[Shape]
+    connections: tuple[list[ConnectionSymbol], list[ConnectionSymbol]]
+
+
+@dataclass
+class BoardResult:
+    image: MatLike
+    contour: MatLike
+    result: Optional[PuzzleImageSolverResult] = None
+    error: Optional[Exception] = None
+
+
 class PuzzleImageSolverPipeline:
-    def __init__(self, image: MatLike):
+    def __init__(
+        self,
+        image: MatLike,
+        cache: Optional[RecognitionCache] = None,
+        layout_profiles: Optional[LayoutProfiles] = None,
+        workers: int = 1,
+        repair_budget: int = REPAIR_BUDGET,
+        stage_hook: Optional[Callable[[str, float], None]] = None,
+    ):
         self.image = image
+        self.cache = cache
+        self.layout_profiles = layout_profiles
+        self.workers = workers
+        self.repair_budget = repair_budget
+        # Called with the name and duration in seconds of every stage run:
+        # find, recognize, repair and solve.
+        self.stage_hook = stage_hook
+
+    def run(self) -> PuzzleImageSolverResult:
+        image_key = None
+
+        if self.cache is not None:
+            image_key = pixels_key(self.image)
+            entry = self.cache.get(image_key)
+
+            if entry is not None:
+                from pango.image_processing.puzzle_image_finder import warp_puzzle
+
+                return self._result_from_cache_entry(
+                    entry, warp_puzzle(self.image, entry.contour)
+                )
+
+        with self._stage("find"):
+            result = self.extract_puzzle_image(self.image)
 
-    def run(self):
-        result = self.extract_puzzle_image(self.image)
+        solved = self.solve_puzzle_image(result)
 
-        cell_images = self.extract_cell_images(result.image)
-        connection_images = self._extract_connection_images(result.image)
+        if self.cache is not None:
+            self.cache.put(image_key, self._cache_entry(solved))
 
-        # puzzle = self.build_puzzle(shapes, connections)
-        #
-        # if not puzzle.is_valid():
-        #     raise InvalidPuzzle()
-        #
-        # puzzle.solve()
-        #
-        # return (result.image, puzzle)
+        return solved
+
+    def run_all(self, workers: Optional[int] = None) -> list[BoardResult]:
+        """Solves every puzzle found in the image, one board per worker thread.
+
+        There is a result for every board, in the order the boards were found,
+        largest first. A board that cannot be solved gets its error instead of
+        failing the others.
+        """
+        results = self.extract_puzzle_images(self.image)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self._solve_board, results))
+
+    def _solve_board(self, result: ExtractedPuzzleImageResult) -> BoardResult:
+        try:
+            solved = self.solve_puzzle_image(result)
+        except (Error, PuzzleError) as error:
+            return BoardResult(image=result.image, contour=result.contour, error=error)
+
+        return BoardResult(image=result.image, contour=result.contour, result=solved)
+
+    def solve_puzzle_image(
+        self, result: ExtractedPuzzleImageResult
+    ) -> PuzzleImageSolverResult:
+        with self._executor() as executor:
+            with self._stage("recognize"):
+                recognition = self.recognize(result.image, executor)
+
+            return self.solve_recognition(result, recognition, executor)
+
+    def solve_recognition(
+        self,
+        result: ExtractedPuzzleImageResult,
+        recognition: Recognition,
+        executor: Optional[Executor] = None,
+    ) -> PuzzleImageSolverResult:
+        """Repairs the recognized puzzle if needed and solves it."""
+        shapes, connections = recognition.shapes, recognition.connections
+        board_key = None
+
+        # The same symbols are the same puzzle, wherever the board was seen.
+        if self.cache is not None:
+            board_key = recognition_key(shapes, connections)
+            entry = self.cache.get(board_key)
+
+            if entry is not None:
+                from pango.image_processing.puzzle_image_finder import warp_puzzle
+
+                return self._result_from_cache_entry(
+                    replace(entry, contour=result.contour), result.image
+                )
+
+        puzzle = self.build_puzzle(shapes, connections)
+        repairs = 0
+
+        # A misread cell or connection usually leaves the puzzle invalid,
+        # unsolvable or ambiguous; retry with the classifiers' alternatives.
+        if self.repair_budget > 0 and puzzle.count_solutions() != 1:
+            try:
+                with self._stage("repair"):
+                    repaired = self.repair(
+                        recognition.cell_images,
+                        recognition.connection_images,
+                        executor,
+                    )
+
+                shapes, connections = repaired.shapes, repaired.connections
+                puzzle, repairs = repaired.puzzle, repaired.repairs
+            except RepairNotFound:
+                pass
+
+        with self._stage("solve"):
+            if not puzzle.is_valid():
+                raise InvalidPuzzle()
+
+            puzzle.solve()
+
+        solved = PuzzleImageSolverResult(
+            image=result.image,
+            contour=result.contour,
+            shapes=shapes,
+            connections=connections,
+            puzzle=puzzle,
+            repairs=repairs,
+            transform=result.transform,
+        )
+
+        if self.cache is not None:
+            self.cache.put(board_key, self._cache_entry(solved))
+
+        return solved
+
+    def recognize(
+        self, puzzle_image: MatLike, executor: Optional[Executor] = None
+    ) -> Recognition:
+        """Normalizes and classifies every cell and connection of a board.
+
+        OpenCV releases the GIL while it works on each crop, so with an
+        executor every crop is one task, and all 96 are submitted before any
+        result is collected.
+        """
+        from pango.image_processing.cell_images_extractor import CellImagesExtractor
+        from pango.image_processing.connection_images_extractor import (
+            ConnectionImagesExtractor,
+        )
+
+        cell_extractor = CellImagesExtractor(puzzle_image, executor)
+        connection_extractor = ConnectionImagesExtractor(puzzle_image, executor)
+
+        if executor is None:
+            cell_images = cell_extractor.extract()
+            connection_images = connection_extractor.extract()
+
+            return Recognition(
+                cell_images,
+                connection_images,
+                self.classify_cells(cell_images),
+                self.classify_connections(connection_images),
+            )
+
+        cells = cell_extractor.submit(classify_shape)
+        vertical, horizontal = connection_extractor.submit(classify_connection)
+
+        cell_images, shapes = zip(*(future.result() for future in cells))
+        vertical_images, vertical_symbols = zip(
+            *(future.result() for future in vertical)
+        )
+        horizontal_images, horizontal_symbols = zip(
+            *(future.result() for future in horizontal)
+        )
+
+        return Recognition(
+            list(cell_images),
+            (list(vertical_images), list(horizontal_images)),
+            list(shapes),
+            (list(vertical_symbols), list(horizontal_symbols)),
+        )
 
     def extract_puzzle_image(self, image: MatLike) -> ExtractedPuzzleImageResult:
-        puzzle_finder = PuzzleImageFinder(image)
+        from pango.image_processing.puzzle_image_finder import PuzzleImageFinder
+
+        puzzle_finder = PuzzleImageFinder(image, self.layout_profiles)
 
         return puzzle_finder.find()
 
-    def extract_cell_images(self, puzzle_image: MatLike) -> list[MatLike]:
-        extractor = CellImagesExtractor(puzzle_image)
+    def extract_puzzle_images(self, image: MatLike) -> list[ExtractedPuzzleImageResult]:
+        from pango.image_processing.puzzle_image_finder import PuzzleImageFinder
+
+        puzzle_finder = PuzzleImageFinder(image)
+
+        return puzzle_finder.find_all()
+
+    def extract_cell_images(
+        self, puzzle_image: MatLike, executor: Optional[Executor] = None
+    ) -> list[MatLike]:
+        from pango.image_processing.cell_images_extractor import CellImagesExtractor
+
+        extractor = CellImagesExtractor(puzzle_image, executor)
 
         return extractor.extract()
 
     def _extract_connection_images(
-        self, puzzle_image: MatLike
+        self, puzzle_image: MatLike, executor: Optional[Executor] = None
     ) -> tuple[list[MatLike], list[MatLike]]:
-        extractor = ConnectionImagesExtractor(puzzle_image)
+        from pango.image_processing.connection_images_extractor import (
+            ConnectionImagesExtractor,
+        )
+
+        extractor = ConnectionImagesExtractor(puzzle_image, executor)
 
         return extractor.extract()
 
+    def classify_cells(
+        self, cell_images: list[MatLike], executor: Optional[Executor] = None
+    ) -> list[Shape]:
+        classify = map if executor is None else executor.map
+
+        return list(classify(classify_shape, cell_images))
+
+    def classify_connections(
+        self,
+        connection_images: tuple[list[MatLike], list[MatLike]],
+        executor: Optional[Executor] = None,
+    ) -> tuple[list[ConnectionSymbol], list[ConnectionSymbol]]:
+        vertical_images, horizontal_images = connection_images
+        classify = map if executor is None else executor.map
+
+        return (
+            list(classify(classify_connection, vertical_images)),
+            list(classify(classify_connection, horizontal_images)),
+        )
+
+    def repair(
+        self,
+        cell_images: list[MatLike],
+        connection_images: tuple[list[MatLike], list[MatLike]],
+        executor: Optional[Executor] = None,
+    ) -> RepairResult:
+        """Searches the ranked alternatives of every crop for a unique puzzle.
+
+        Takes the normalized crops that were classified, so only the ranking
+        is computed again.
+        """
+        vertical_images, horizontal_images = connection_images
+        rank = map if executor is None else executor.map
+
+        repair = RecognitionRepair(
+            list(rank(rank_shape, cell_images)),
+            (
+                list(rank(rank_connection, vertical_images)),
+                list(rank(rank_connection, horizontal_images)),
+            ),
+            self.build_puzzle,
+            budget=self.repair_budget,
+        )
+
+        return repair.repair()
+
+    @contextmanager
+    def _stage(self, name: str):
+        if self.stage_hook is None:
+            yield
+            return
+
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.stage_hook(name, time.perf_counter() - start)
+
+    def _executor(self):
+        if self.workers > 1:
+            return ThreadPoolExecutor(max_workers=self.workers)
+
+        return nullcontext()
+
+    def _cache_entry(self, result: PuzzleImageSolverResult) -> RecognitionCacheEntry:
+        return RecognitionCacheEntry(
+            contour=result.contour,
+            shapes=result.shapes,
+            connections=result.connections,
+            solution=result.puzzle.values(),
+            repairs=result.repairs,
+        )
+
+    def _result_from_cache_entry(
+        self, entry: RecognitionCacheEntry, image: MatLike
+    ) -> PuzzleImageSolverResult:
+        puzzle = self.build_puzzle(entry.shapes, entry.connections)
+        puzzle.fill(entry.solution)
+        from pango.image_processing.puzzle_image_finder import perspective_transform
+
+        transform, _ = perspective_transform(entry.contour)
+
+        return PuzzleImageSolverResult(
+            image=image,
+            contour=entry.contour,
+            shapes=entry.shapes,
+            connections=entry.connections,
+            puzzle=puzzle,
+            repairs=entry.repairs,
+            transform=transform,
+        )
+
     def build_puzzle(
         self,
         shapes: list[Shape],
@@ -152,6 +504,8 @@ class PuzzleImageSolverPipeline:
 
     @staticmethod
     def load_image(image_path: str) -> "PuzzleImageSolverPipeline":
+        import cv2
+
         image = cv2.imread(image_path)
 
         if image is None:
@@ -0,0 +1,216 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+import hashlib
+import json
+import os
+import threading
+
+from pango.image_processing.symbols import ConnectionSymbol, Shape
+from pango.puzzle import CellValue, SymbolType
+
+if TYPE_CHECKING:
+    from cv2.typing import MatLike
+
+PIXELS_KEY_PREFIX = "pixels-"
+RECOGNITION_KEY_PREFIX = "labels-"
+# Share of `max_disk_entries` kept when the disk tier is trimmed, so the
+# directory is only scanned once every few hundred writes.
+DISK_TRIM_RATIO = 0.9
+
+
+@dataclass
+class RecognitionCacheEntry:
+    """What was recognized on a board and its solution.
+
+    The board image is not kept; it is warped again from `contour` when needed.
+    """
+
+    contour: "MatLike"
+    shapes: list[Shape]
+    connections: tuple[list[ConnectionSymbol], list[ConnectionSymbol]]
+    solution: list[list[CellValue]]
+    repairs: int = 0
+
+
+def pixels_key(image: "MatLike") -> str:
+    digest = hashlib.sha256()
+    digest.update(str(image.shape).encode())
+    digest.update(image.tobytes())
+
+    return PIXELS_KEY_PREFIX + digest.hexdigest()
+
+
+def recognition_key(
+    shapes: list[Shape],
+    connections: tuple[list[ConnectionSymbol], list[ConnectionSymbol]],
+) -> str:
+    """Key of a recognized board, one symbol per cell and connection.
+
+    Boards with the same symbols are the same puzzle and share a solution, so
+    a hit never serves the solution of a different puzzle.
+    """
+    vertical, horizontal = connections
+    symbols = [shapes, vertical, horizontal]
+    digest = hashlib.sha256(
+        "|".join(
+            ",".join(str(symbol) for symbol in group) for group in symbols
+        ).encode()
+    )
+
+    return RECOGNITION_KEY_PREFIX + digest.hexdigest()
+
+
+def entry_to_json(entry: RecognitionCacheEntry) -> dict:
+    vertical, horizontal = entry.connections
+
+    return {
+        "contour": entry.contour.tolist(),
+        "shapes": [shape.name for shape in entry.shapes],
+        "connections": [
+            [symbol.name for symbol in vertical],
+            [symbol.name for symbol in horizontal],
+        ],
+        "solution": [
+            [value.name if value is not None else None for value in row]
+            for row in entry.solution
+        ],
+        "repairs": entry.repairs,
+    }
+
+
+def entry_from_json(data: dict) -> RecognitionCacheEntry:
+    import numpy as np
+
+    vertical, horizontal = data["connections"]
+
+    return RecognitionCacheEntry(
+        contour=np.array(data["contour"], dtype=np.int32),
+        shapes=[Shape[name] for name in data["shapes"]],
+        connections=(
+            [ConnectionSymbol[name] for name in vertical],
+            [ConnectionSymbol[name] for name in horizontal],
+        ),
+        solution=[
+            [SymbolType[name] if name is not None else None for name in row]
+            for row in data["solution"]
+        ],
+        repairs=data["repairs"],
+    )
+
+
+class RecognitionCache:
+    """LRU cache of recognized puzzles with an optional on-disk tier.
+
+    The in-memory tier holds at most `max_entries` entries, each a few
+    kilobytes. When `directory` is given, every entry is also written there as
+    JSON so it survives restarts. Once the directory holds more than
+    `max_disk_entries` files, the oldest are removed.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 128,
+        directory: Optional[str] = None,
+        max_disk_entries: int = 4096,
+    ):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self._entries: OrderedDict[str, RecognitionCacheEntry] = OrderedDict()
+        self._lock = threading.RLock()
+        self._disk_entries = 0
+
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._disk_entries = len(self._disk_paths())
+
+    def get(self, key: str) -> Optional[RecognitionCacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+            entry = self._load_from_disk(key)
+
+            if entry is not None:
+                self._store_in_memory(key, entry)
+
+            return entry
+
+    def put(self, key: str, entry: RecognitionCacheEntry):
+        with self._lock:
+            self._store_in_memory(key, entry)
+
+            if self.directory is not None:
+                self._save_to_disk(key, entry)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries or (
+            self.directory is not None and os.path.exists(self._disk_path(key))
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store_in_memory(self, key: str, entry: RecognitionCacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return f"{self.directory}/{key}.json"
+
+    def _disk_paths(self) -> list[str]:
+        return [
+            entry.path
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith(".json")
+        ]
+
+    def _load_from_disk(self, key: str) -> Optional[RecognitionCacheEntry]:
+        if self.directory is None:
+            return None
+
+        path = self._disk_path(key)
+
+        try:
+            with open(path) as file:
+                entry = entry_from_json(json.load(file))
+        except (OSError, ValueError, KeyError):
+            return None
+
+        os.utime(path)
+
+        return entry
+
+    def _save_to_disk(self, key: str, entry: RecognitionCacheEntry):
+        path = self._disk_path(key)
+        temporary_path = f"{path}.tmp"
+        exists = os.path.exists(path)
+
+        with open(temporary_path, "w") as file:
+            json.dump(entry_to_json(entry), file)
+
+        os.replace(temporary_path, path)
+
+        if not exists:
+            self._disk_entries += 1
+
+        if self._disk_entries > self.max_disk_entries:
+            self._trim_disk()
+
+    def _trim_disk(self):
+        paths = self._disk_paths()
+        keep = int(self.max_disk_entries * DISK_TRIM_RATIO)
+
+        paths.sort(key=os.path.getmtime)
+
+        for path in paths[: max(0, len(paths) - keep)]:
+            os.remove(path)
+
+        self._disk_entries = min(len(paths), keep)
@@ -0,0 +1,130 @@
+from dataclasses import dataclass
+from typing import Callable
+import heapq
+import math
+
+from pango.image_processing.symbols import ConnectionSymbol, Shape
+from pango.puzzle import Puzzle
+
+REPAIR_BUDGET = 200
+MAXIMUM_REPAIRS = 3
+REPAIR_CANDIDATES = 12
+CELLS_COUNT = 36
+CONNECTIONS_COUNT = 30
+
+Connections = tuple[list[ConnectionSymbol], list[ConnectionSymbol]]
+Ranking = list[tuple[Shape | ConnectionSymbol, float]]
+
+
+class Error(Exception):
+    pass
+
+
+class RepairNotFound(Error):
+    def __init__(self, attempts: int = 0):
+        super().__init__(f"No uniquely solvable repair found in {attempts} attempts.")
+
+
+@dataclass
+class RepairResult:
+    shapes: list[Shape]
+    connections: Connections
+    puzzle: Puzzle
+    repairs: int
+
+
+class RecognitionRepair:
+    """Searches for the most likely recognition that makes a unique puzzle.
+
+    Takes the ranked alternatives of every cell and connection, as returned by
+    the classifiers' `rank`, and replaces the top choices of the least
+    confident ones. Replacing a choice costs the log ratio of its confidence to
+    the top confidence, so candidates are tried best first, in order of
+    decreasing likelihood of the whole recognition. The search stops at the
+    first candidate whose puzzle is valid with exactly one solution, or after
+    `budget` candidates.
+    """
+
+    def __init__(
+        self,
+        cell_rankings: list[Ranking],
+        connection_rankings: tuple[list[Ranking], list[Ranking]],
+        build_puzzle: Callable[[list[Shape], Connections], Puzzle],
+        budget: int = REPAIR_BUDGET,
+        max_repairs: int = MAXIMUM_REPAIRS,
+        candidates: int = REPAIR_CANDIDATES,
+    ):
+        vertical_rankings, horizontal_rankings = connection_rankings
+
+        self.rankings = cell_rankings + vertical_rankings + horizontal_rankings
+        self.build_puzzle = build_puzzle
+        self.budget = budget
+        self.max_repairs = max_repairs
+        self.candidates = candidates
+
+    def repair(self) -> RepairResult:
+        alternatives = self._alternatives()
+        heap: list[tuple[float, tuple[tuple[int, int], ...]]] = [(0.0, ())]
+        attempts = 0
+
+        while len(heap) > 0 and attempts < self.budget:
+            cost, changes = heapq.heappop(heap)
+
+            if len(changes) > 0:
+                attempts += 1
+                symbols = self._apply(alternatives, changes)
+                puzzle = self.build_puzzle(*symbols)
+
+                if puzzle.count_solutions() == 1:
+                    return RepairResult(*symbols, puzzle, len(changes))
+
+            if len(changes) == self.max_repairs:
+                continue
+
+            first = changes[-1][0] + 1 if len(changes) > 0 else 0
+
+            for candidate in range(first, len(alternatives)):
+                _, options = alternatives[candidate]
+
+                for option, (_, option_cost) in enumerate(options):
+                    heapq.heappush(
+                        heap, (cost + option_cost, changes + ((candidate, option),))
+                    )
+
+        raise RepairNotFound(attempts)
+
+    def _alternatives(self) -> list[tuple[int, list[tuple[object, float]]]]:
+        """The least confident positions, each with its replacement costs."""
+        alternatives = []
+
+        for position, ranking in enumerate(self.rankings):
+            _, top_confidence = ranking[0]
+            options = [
+                (symbol, max(0.0, math.log(top_confidence / max(confidence, 1e-9))))
+                for symbol, confidence in ranking[1:]
+            ]
+
+            if len(options) > 0:
+                alternatives.append((position, options))
+
+        alternatives.sort(key=lambda item: item[1][0][1])
+
+        return alternatives[: self.candidates]
+
+    def _apply(
+        self,
+        alternatives: list[tuple[int, list[tuple[object, float]]]],
+        changes: tuple[tuple[int, int], ...],
+    ) -> tuple[list[Shape], Connections]:
+        symbols = [ranking[0][0] for ranking in self.rankings]
+
+        for candidate, option in changes:
+            position, options = alternatives[candidate]
+            symbols[position] = options[option][0]
+
+        vertical_end = CELLS_COUNT + CONNECTIONS_COUNT
+
+        return symbols[:CELLS_COUNT], (
+            symbols[CELLS_COUNT:vertical_end],
+            symbols[vertical_end:],
+        )
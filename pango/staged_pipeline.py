@@ -0,0 +1,391 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.synchronize import Event
+from typing import Callable, Iterable, Iterator, Optional
+import argparse
+import glob
+import multiprocessing
+import os
+import threading
+import time
+
+import cv2
+from cv2.typing import MatLike
+import numpy as np
+
+from pango.dataset.dataset_packer import ALLOWED_EXTENSIONS
+from pango.image_processing.puzzle_image_finder import ExtractedPuzzleImageResult
+from pango.puzzle_image_solver import (
+    PuzzleImageSolverPipeline,
+    PuzzleImageSolverResult,
+    Recognition,
+)
+
+QUEUE_SIZE = 4
+
+
+@dataclass
+class SharedImage:
+    """Describes an image stored in a named shared memory block.
+
+    Only this descriptor travels through the queues. The block is created by
+    the producing stage and unlinked by whichever stage consumes it last.
+    """
+
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+    @staticmethod
+    def create(image: MatLike) -> "SharedImage":
+        block = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+        shared = SharedImage(block.name, image.shape, image.dtype.str)
+
+        np.ndarray(image.shape, dtype=image.dtype, buffer=block.buf)[:] = image
+        block.close()
+
+        return shared
+
+    @contextmanager
+    def open(self, unlink: bool = False) -> Iterator[MatLike]:
+        """Maps the image without copying it.
+
+        The array must not be used, or referenced, after the block is left.
+        """
+        block = shared_memory.SharedMemory(name=self.name)
+        image = np.ndarray(self.shape, dtype=self.dtype, buffer=block.buf)
+
+        try:
+            yield image
+        finally:
+            del image
+            block.close()
+
+            if unlink:
+                block.unlink()
+
+    def read(self) -> MatLike:
+        """Copies the image out of shared memory and frees the block."""
+        with self.open(unlink=True) as image:
+            return image.copy()
+
+    def unlink(self):
+        try:
+            block = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return
+
+        block.close()
+        block.unlink()
+
+
+@dataclass
+class StagedJob:
+    index: int
+    path: str
+    frame: Optional[SharedImage] = None
+    board: Optional[SharedImage] = None
+    contour: Optional[MatLike] = None
+    transform: Optional[MatLike] = None
+    recognition: Optional[Recognition] = None
+    result: Optional[PuzzleImageSolverResult] = None
+    error: Optional[str] = None
+
+    def release(self):
+        for shared in (self.frame, self.board):
+            if shared is not None:
+                shared.unlink()
+
+        self.frame = None
+        self.board = None
+
+
+@dataclass
+class StagedResult:
+    index: int
+    path: str
+    result: Optional[PuzzleImageSolverResult] = None
+    error: Optional[str] = None
+
+
+def decode(job: StagedJob) -> StagedJob:
+    image = cv2.imread(job.path)
+
+    if image is None:
+        raise ValueError(f"Could not load image from path: {job.path}")
+
+    job.frame = SharedImage.create(image)
+
+    return job
+
+
+def localize(job: StagedJob) -> StagedJob:
+    # The frame is unlinked when it is left, whether or not a board is found.
+    shared_frame, job.frame = job.frame, None
+
+    with shared_frame.open(unlink=True) as frame:
+        pipeline = PuzzleImageSolverPipeline(frame)
+        result = pipeline.extract_puzzle_image(frame)
+        del pipeline
+
+    job.board = SharedImage.create(result.image)
+    job.contour = result.contour
+    job.transform = result.transform
+
+    return job
+
+
+def classify(job: StagedJob) -> StagedJob:
+    with job.board.open() as board:
+        pipeline = PuzzleImageSolverPipeline(board)
+        job.recognition = pipeline.recognize(board)
+        del pipeline
+
+    return job
+
+
+def solve(job: StagedJob) -> StagedJob:
+    # Repairing and solving only need the recognition; the board is attached
+    # to the result by the parent, which frees its block.
+    board = ExtractedPuzzleImageResult(
+        image=None, enhanced=None, contour=job.contour, transform=job.transform
+    )
+    pipeline = PuzzleImageSolverPipeline(None)
+
+    job.result = pipeline.solve_recognition(board, job.recognition)
+    job.recognition = None
+
+    return job
+
+
+STAGES: list[Callable[[StagedJob], StagedJob]] = [decode, localize, classify, solve]
+
+
+def run_stage(
+    stage: Callable[[StagedJob], StagedJob],
+    input_queue: multiprocessing.Queue,
+    output_queue: multiprocessing.Queue,
+    stopped: Event,
+):
+    # Parallelism comes from the stage processes, not from OpenCV's own pool.
+    cv2.setNumThreads(1)
+
+    while True:
+        job = input_queue.get()
+
+        if job is None:
+            return
+
+        # Once stopped, jobs only travel on to the parent, which frees them.
+        if stopped.is_set() and job.error is None:
+            job.release()
+            job.error = "Stopped."
+
+        if job.error is None:
+            try:
+                job = stage(job)
+            except Exception as error:
+                job.release()
+                job.error = f"{type(error).__name__}: {error}"
+
+        output_queue.put(job)
+
+
+class StagedPipelineExecutor:
+    """Solves many images with decode, localize, classify and solve running
+    concurrently, each stage in its own pool of processes.
+
+    Stages are connected by bounded queues, so a slow stage holds back the
+    ones before it instead of piling up frames. Images and warped boards stay
+    in shared memory; the queues only carry `SharedImage` descriptors and the
+    small recognition results. Localization is by far the slowest stage, so it
+    gets a worker per core by default.
+    """
+
+    def __init__(
+        self,
+        decode_workers: int = 1,
+        localize_workers: Optional[int] = None,
+        classify_workers: int = 1,
+        solve_workers: int = 1,
+        queue_size: int = QUEUE_SIZE,
+    ):
+        self.workers = [
+            decode_workers,
+            localize_workers or os.cpu_count() or 1,
+            classify_workers,
+            solve_workers,
+        ]
+
+        if min(self.workers) < 1:
+            raise ValueError(f"Every stage needs at least one worker: {self.workers}")
+
+        self.queue_size = queue_size
+
+    def run(self, paths: Iterable[str]) -> Iterator[StagedResult]:
+        """Yields a result for every path, in the order they complete."""
+        queues = [
+            multiprocessing.Queue(self.queue_size) for _ in range(len(STAGES) + 1)
+        ]
+        stopped = multiprocessing.Event()
+        stages = [
+            [
+                multiprocessing.Process(
+                    target=run_stage,
+                    args=(stage, queues[i], queues[i + 1], stopped),
+                    daemon=True,
+                )
+                for _ in range(self.workers[i])
+            ]
+            for i, stage in enumerate(STAGES)
+        ]
+
+        # Stage processes must share the parent's tracker of shared memory
+        # blocks. A tracker of their own would unlink the blocks still in
+        # flight as soon as the process that created them exits.
+        resource_tracker.ensure_running()
+
+        for processes in stages:
+            for process in processes:
+                process.start()
+
+        threads = [
+            threading.Thread(target=self._feed, args=(paths, queues[0], stopped))
+        ]
+
+        for i, processes in enumerate(stages):
+            downstream = self.workers[i + 1] if i + 1 < len(STAGES) else 1
+            threads.append(
+                threading.Thread(
+                    target=self._close_stage,
+                    args=(processes, queues[i + 1], downstream),
+                )
+            )
+
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        finished = False
+
+        try:
+            while (job := queues[-1].get()) is not None:
+                yield self._result(job)
+
+            finished = True
+        finally:
+            if not finished:
+                self._stop(stopped, queues[-1])
+
+            for processes in stages:
+                for process in processes:
+                    process.join()
+
+    def _stop(self, stopped: Event, results: multiprocessing.Queue):
+        """Winds the stages down when the caller stops iterating early.
+
+        The feeder stops and every stage passes the jobs it still gets
+        straight on, so each job in flight reaches the parent, which frees
+        its blocks, followed by the sentinels that end the stages.
+        """
+        stopped.set()
+
+        while (job := results.get()) is not None:
+            job.release()
+
+    def _feed(
+        self,
+        paths: Iterable[str],
+        jobs: multiprocessing.Queue,
+        stopped: Event,
+    ):
+        for index, path in enumerate(paths):
+            if stopped.is_set():
+                break
+
+            jobs.put(StagedJob(index, path))
+
+        for _ in range(self.workers[0]):
+            jobs.put(None)
+
+    def _close_stage(
+        self,
+        processes: list[multiprocessing.Process],
+        jobs: multiprocessing.Queue,
+        downstream: int,
+    ):
+        for process in processes:
+            process.join()
+
+        for _ in range(downstream):
+            jobs.put(None)
+
+    def _result(self, job: StagedJob) -> StagedResult:
+        if job.error is not None:
+            return StagedResult(job.index, job.path, error=job.error)
+
+        job.result.image = job.board.read()
+
+        return StagedResult(job.index, job.path, result=job.result)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Solve a directory of screenshots with a staged pipeline."
+    )
+
+    parser.add_argument(
+        "--input-dir",
+        type=str,
+        required=True,
+        help="Directory of screenshots to solve.",
+    )
+
+    for stage in ["decode", "localize", "classify", "solve"]:
+        parser.add_argument(
+            f"--{stage}-workers",
+            type=int,
+            default=None if stage == "localize" else 1,
+            help=f"Number of {stage} processes.",
+        )
+
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=QUEUE_SIZE,
+        help="Maximum number of jobs waiting between two stages.",
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    paths = sorted(
+        path
+        for ext in ALLOWED_EXTENSIONS
+        for path in glob.glob(f"{args.input_dir}/*{ext}")
+    )
+    executor = StagedPipelineExecutor(
+        decode_workers=args.decode_workers,
+        localize_workers=args.localize_workers,
+        classify_workers=args.classify_workers,
+        solve_workers=args.solve_workers,
+        queue_size=args.queue_size,
+    )
+
+    start = time.perf_counter()
+    count = 0
+
+    for result in executor.run(paths):
+        count += 1
+        status = "solved" if result.error is None else result.error
+        print(f"{result.path}: {status}")
+
+    elapsed = time.perf_counter() - start
+    print(f"{count} images in {elapsed:.2f} s, {count / elapsed:.1f} images/s")
+
+
+if __name__ == "__main__":
+    main()
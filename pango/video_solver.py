@@ -0,0 +1,320 @@
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+import argparse
+import time
+
+import cv2
+from cv2.typing import MatLike
+import numpy as np
+
+from pango.image_processing.cell_images_extractor import CellImagesExtractor
+from pango.image_processing.connection_classifier import (
+    ConnectionClassifier,
+    ConnectionSymbol,
+)
+from pango.image_processing.connection_images_extractor import ConnectionImagesExtractor
+from pango.image_processing.image_normalizer import ImageNormalizer
+from pango.image_processing.puzzle_image_finder import (
+    NoPuzzleFoundError,
+    PuzzleImageFinder,
+    draw_contours,
+)
+from pango.image_processing.quad_tracker import QuadTracker
+from pango.image_processing.shape_classifier import Shape, ShapeClassifier
+from pango.image_processing.solution_renderer import SolutionRenderer
+from pango.puzzle import NoSolutionFound, Puzzle
+from pango.puzzle_image_solver import (
+    InvalidPuzzle,
+    PuzzleImageSolverPipeline,
+    solved_cells,
+)
+
+CELLS_COUNT = 36
+CONNECTIONS_COUNT = 30
+SIGNATURE_SIZE = (16, 16)
+CHANGE_THRESHOLD = 8.0
+
+
+@dataclass
+class FrameResult:
+    index: int
+    contour: Optional[MatLike] = None
+    transform: Optional[MatLike] = None
+    board_size: Optional[tuple[int, int]] = None
+    puzzle: Optional[Puzzle] = None
+    shapes: list[Shape] = field(default_factory=list)
+    connections: tuple[list[ConnectionSymbol], list[ConnectionSymbol]] = field(
+        default_factory=lambda: ([], [])
+    )
+    detected: bool = False
+    reclassified: int = 0
+    elapsed: float = 0.0
+    error: Optional[Exception] = None
+
+
+def open_frames(source: str) -> Iterator[MatLike]:
+    capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video source: {source}")
+
+    try:
+        while True:
+            ok, frame = capture.read()
+
+            if not ok:
+                return
+
+            yield frame
+    finally:
+        capture.release()
+
+
+def board_size(corners: MatLike) -> tuple[int, int]:
+    from imutils.perspective import order_points
+
+    top_left, top_right, bottom_right, bottom_left = order_points(corners)
+
+    width = max(
+        np.linalg.norm(bottom_right - bottom_left),
+        np.linalg.norm(top_right - top_left),
+    )
+    height = max(
+        np.linalg.norm(top_right - bottom_right),
+        np.linalg.norm(top_left - bottom_left),
+    )
+
+    return int(width), int(height)
+
+
+def crop_signature(crop: MatLike) -> MatLike:
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+
+    return cv2.resize(gray, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA).astype(
+        np.int16
+    )
+
+
+class VideoPuzzleSolver:
+    """Solves a puzzle over a stream of frames.
+
+    The board is located with `PuzzleImageFinder` once and then followed with a
+    `QuadTracker`; full detection only runs again when tracking is lost. Every
+    frame is warped to the board size fixed at the first detection, and only the
+    crops whose downscaled signature changed by more than `change_threshold`
+    grey levels are normalized and classified again. The puzzle is rebuilt and
+    solved only when the recognition changes.
+    """
+
+    def __init__(self, change_threshold: float = CHANGE_THRESHOLD):
+        self.change_threshold = change_threshold
+        self._tracker = QuadTracker()
+        self._board_size: Optional[tuple[int, int]] = None
+        self._signatures: list[Optional[MatLike]] = []
+        self._labels: list = []
+        self._puzzle: Optional[Puzzle] = None
+        self._error: Optional[Exception] = None
+
+    def run(self, frames: Iterable[MatLike]) -> Iterator[FrameResult]:
+        for index, frame in enumerate(frames):
+            yield self.process(index, frame)
+
+    def process(self, index: int, frame: MatLike) -> FrameResult:
+        start = time.perf_counter()
+        result = FrameResult(index=index)
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        corners = self._tracker.track(gray)
+
+        if corners is None:
+            result.detected = True
+            corners = self._detect(frame, gray)
+
+        if corners is None:
+            result.elapsed = time.perf_counter() - start
+            return result
+
+        board, result.transform = self._warp(frame, corners)
+        result.board_size = self._board_size
+        result.reclassified, changed = self._update_labels(board)
+
+        if changed:
+            self._solve(frame)
+
+        result.contour = corners.reshape(4, 1, 2).astype(np.int32)
+        result.shapes = self._labels[:CELLS_COUNT]
+        result.connections = (
+            self._labels[CELLS_COUNT : CELLS_COUNT + CONNECTIONS_COUNT],
+            self._labels[CELLS_COUNT + CONNECTIONS_COUNT :],
+        )
+        result.puzzle = self._puzzle
+        result.error = self._error
+        result.elapsed = time.perf_counter() - start
+
+        return result
+
+    def _detect(self, frame: MatLike, gray: MatLike) -> Optional[MatLike]:
+        try:
+            contour = PuzzleImageFinder(frame).find().contour
+        except NoPuzzleFoundError:
+            return None
+
+        corners = contour.reshape(4, 2).astype(np.float32)
+        self._tracker.reset(gray, corners)
+
+        if self._board_size is None:
+            self._board_size = board_size(corners)
+
+        return corners
+
+    def _warp(self, frame: MatLike, corners: MatLike) -> tuple[MatLike, MatLike]:
+        from imutils.perspective import order_points
+
+        width, height = self._board_size
+        destination = np.array(
+            [[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]],
+            dtype=np.float32,
+        )
+        transform = cv2.getPerspectiveTransform(
+            order_points(corners).astype(np.float32), destination
+        )
+
+        return cv2.warpPerspective(frame, transform, (width, height)), transform
+
+    def _update_labels(self, board: MatLike) -> tuple[int, bool]:
+        vertical_crops, horizontal_crops = ConnectionImagesExtractor(board).crop()
+        crops = CellImagesExtractor(board).crop() + vertical_crops + horizontal_crops
+
+        if len(self._signatures) != len(crops):
+            self._signatures = [None] * len(crops)
+            self._labels = [None] * len(crops)
+
+        reclassified = 0
+        changed = False
+
+        for i, crop in enumerate(crops):
+            signature = crop_signature(crop)
+            previous = self._signatures[i]
+
+            if (
+                previous is not None
+                and np.abs(signature - previous).mean() <= self.change_threshold
+            ):
+                continue
+
+            label = self._classify(i, crop)
+
+            self._signatures[i] = signature
+            reclassified += 1
+
+            if label != self._labels[i]:
+                self._labels[i] = label
+                changed = True
+
+        return reclassified, changed
+
+    def _classify(self, index: int, crop: MatLike):
+        image = ImageNormalizer(crop).normalize()
+
+        if index < CELLS_COUNT:
+            return ShapeClassifier(image).classify()
+
+        return ConnectionClassifier(image).classify()
+
+    def _solve(self, frame: MatLike):
+        pipeline = PuzzleImageSolverPipeline(frame)
+        puzzle = pipeline.build_puzzle(
+            self._labels[:CELLS_COUNT],
+            (
+                self._labels[CELLS_COUNT : CELLS_COUNT + CONNECTIONS_COUNT],
+                self._labels[CELLS_COUNT + CONNECTIONS_COUNT :],
+            ),
+        )
+
+        self._puzzle = None
+        self._error = None
+
+        try:
+            if not puzzle.is_valid():
+                raise InvalidPuzzle()
+
+            puzzle.solve()
+        except (InvalidPuzzle, NoSolutionFound) as error:
+            self._error = error
+            return
+
+        self._puzzle = puzzle
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Solve a puzzle from a video file or camera stream."
+    )
+
+    parser.add_argument(
+        "--input",
+        type=str,
+        required=True,
+        help="Path to a video file or a camera index.",
+    )
+
+    parser.add_argument(
+        "--display",
+        action="store_true",
+        help="Show the frames with the tracked puzzle outline.",
+    )
+
+    parser.add_argument(
+        "--overlay",
+        action="store_true",
+        help="Draw the solution onto the displayed frames. Implies --display.",
+    )
+
+    args = parser.parse_args()
+    args.display = args.display or args.overlay
+
+    return args
+
+
+def main():
+    args = parse_args()
+    solver = VideoPuzzleSolver()
+    renderer = SolutionRenderer()
+
+    for index, frame in enumerate(open_frames(args.input)):
+        result = solver.process(index, frame)
+
+        if result.puzzle is not None:
+            status = "solved"
+        elif result.contour is not None:
+            status = "unsolved"
+        else:
+            status = "no puzzle"
+
+        print(
+            f"Frame {index}: {status}, detected: {result.detected}, "
+            f"reclassified: {result.reclassified}, {result.elapsed * 1000:.1f} ms"
+        )
+
+        if args.display:
+            if result.contour is not None:
+                draw_contours(frame, [result.contour])
+
+            if args.overlay and result.puzzle is not None:
+                renderer.render(
+                    frame,
+                    result.transform,
+                    result.board_size,
+                    solved_cells(result.shapes, result.puzzle),
+                )
+
+            cv2.imshow("Puzzle - Press Esc to exit", frame)
+
+            if cv2.waitKey(1) == 27:
+                break
+
+    cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()